@@ -1,19 +1,47 @@
 # app.py
+if __name__ == '__main__':
+    # `python app.py` runs the dev server through the Flask CLI. The bcrypt
+    # pool's worker processes re-import the __main__ script, and this module's
+    # startup (Mongo, indexes, models) must not run again in each of them.
+    import os
+    import subprocess
+    import sys
+    sys.exit(subprocess.call([sys.executable, '-m', 'flask', '--app', os.path.abspath(__file__),
+                              'run', '--host', '0.0.0.0', '--port', '5000', '--debug']))
+
 # --- 1. Import Libraries ---
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_pymongo import PyMongo
-from flask_bcrypt import Bcrypt
 from flask_cors import CORS
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import joblib
+import numpy as np
 import pandas as pd
 import os
 from dotenv import load_dotenv
 import openai
 import requests
-from bs4 import BeautifulSoup
 from googlesearch import search 
 from datetime import datetime
-import re
+import hashlib
+import json
+import threading
+import time
+
+from batching import MicroBatcher
+from catalogue import CatalogueIndex, bump_stored_version, read_stored_version
+from compact_model import load_compact_model
+from db_indexes import audit_queries, ensure_indexes, print_audit
+from ingest import DEFAULT_CSV_PATH, ingest_catalogue
+from jobs import JobQueue
+from llm_gateway import LLMGateway, create_backend
+from metrics import MetricsRegistry, MongoCommandTimer, SlowRequestProfiler, instrument_flask, outbound_response_hook
+from passwords import PasswordHasher, SessionTokens
+from scraper import Scraper
+from exports import EXPORT_BATCH_SIZE, EXPORT_FORMATS, build_export_query, export_sort, stream_export
+from prediction_cache import PredictionCache, fingerprinted_load
+from ratings import apply_rating_change, read_rating_aggregates, rebuild_rating_aggregates, validate_rating
 
 # --- 2. Load Environment Variables ---
 load_dotenv()
@@ -22,30 +50,148 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+# Latency histograms for requests, the model, Mongo, outbound HTTP and the LLM, served at /metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.histogram(
+    'http_request_duration_seconds', 'Time to handle a request (to the first byte when streamed)',
+    ('method', 'route', 'status'))
+MODEL_LATENCY = metrics.histogram('model_predict_seconds', 'Time per predict_proba call', ('backend',))
+MONGO_LATENCY = metrics.histogram(
+    'mongo_command_duration_seconds', 'Round trip of each MongoDB command', ('command', 'collection', 'outcome'))
+OUTBOUND_LATENCY = metrics.histogram(
+    'outbound_http_duration_seconds', 'Outbound HTTP time to response headers', ('method', 'status'))
+LLM_LATENCY = metrics.histogram('llm_upstream_duration_seconds', 'Upstream LLM call duration', ('kind',))
+mongo_timer = MongoCommandTimer(MONGO_LATENCY)
+
+# Opt-in: dump collapsed stacks of sampled requests slower than PROFILE_SLOW_MS into PROFILE_DIR
+profiler = None
+if os.getenv('PROFILE_DIR'):
+    profiler = SlowRequestProfiler(
+        os.getenv('PROFILE_DIR'),
+        sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0.01)),
+        threshold=float(os.getenv('PROFILE_SLOW_MS', 500)) / 1000,
+        interval=float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000,
+    )
+if METRICS_ENABLED:
+    instrument_flask(app, REQUEST_LATENCY, profiler)
+
 # --- 4. Configure MongoDB ---
 app.config['MONGO_URI'] = os.getenv('MONGO_URI')  # e.g., mongodb://localhost:27017/university_db
-mongo = PyMongo(app)
+mongo = PyMongo(app, event_listeners=[mongo_timer] if METRICS_ENABLED else [])
+
+# --- 5. Initialize Password Hashing ---
+# bcrypt runs on a bounded process pool; stored hashes with another cost are upgraded at login
+hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_LOG_ROUNDS', 12)),
+    max_workers=int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None,
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64)),
+)
 
-# --- 5. Initialize Bcrypt ---
-bcrypt = Bcrypt(app)
+# Signed session tokens let profile calls skip the user lookup after login
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    app.config['SECRET_KEY'] = os.urandom(32).hex()
+    print("⚠️ SECRET_KEY not set; session tokens are only valid in this process")
+session_tokens = SessionTokens(app.config['SECRET_KEY'], max_age=int(os.getenv('SESSION_TOKEN_TTL', 900)))
 
 # --- 6. Load ML Model ---
-MODEL_PATH = 'C:/Users/User/Desktop/2 Sem/FinalProjectDoc/Application1/backend/university_recommendation_model.joblib'
-try:
-    model = joblib.load(MODEL_PATH)
-    print("✅ Model loaded successfully!")
-except Exception as e:
-    print(f"❌ Model load error: {e}")
-    model = None
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.getenv('MODEL_PATH', os.path.join(BASE_DIR, 'university_recommendation_model.joblib'))
+COMPACT_MODEL_PATH = os.getenv('COMPACT_MODEL_PATH', os.path.join(BASE_DIR, 'university_recommendation_model.compact'))
+
+# Fingerprints of the model files this process loaded, for the prediction cache keys
+MODEL_FINGERPRINTS = {}
+
+def load_model():
+    try:
+        start = time.perf_counter()
+        loaded, MODEL_FINGERPRINTS['sklearn'] = fingerprinted_load(MODEL_PATH, joblib.load)
+        print(f"✅ Model loaded successfully in {(time.perf_counter() - start) * 1000:.0f} ms!")
+        return loaded
+    except Exception as e:
+        print(f"❌ Model load error: {e}")
+        return None
+
+def load_compact():
+    # Memory-mapped arrays are paged in on first use and shared across worker processes
+    if not os.path.isdir(COMPACT_MODEL_PATH):
+        return None
+    try:
+        # The fingerprint is the content hash written at export, so nothing is read beyond meta.json
+        loaded = load_compact_model(COMPACT_MODEL_PATH, mmap=True)
+        MODEL_FINGERPRINTS['compact'] = loaded.fingerprint
+        print(f"✅ Compact model mapped in {loaded.load_seconds * 1000:.1f} ms ({loaded.n_trees} trees)")
+        return loaded
+    except Exception as e:
+        print(f"❌ Compact model load error: {e}")
+        return None
+
+compact_model = load_compact()
+# The compact NumPy engine serves predictions when available. Its per-call
+# overhead is lowest for small inputs, but sklearn's compiled tree walk wins
+# on large batches, so batches above COMPACT_MAX_ROWS go to the joblib
+# pipeline (0 keeps everything on the compact engine). Unpickling the
+# pipeline costs seconds and hundreds of MB per worker, so in compact mode
+# it is only loaded when the first such batch arrives.
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'compact' if compact_model is not None else 'sklearn')
+COMPACT_MAX_ROWS = int(os.getenv('COMPACT_MAX_ROWS', 64))
+model = load_model() if INFERENCE_BACKEND == 'sklearn' else None
+predictor = compact_model if INFERENCE_BACKEND == 'compact' else model
+large_batch_model_lock = threading.Lock()
+large_batch_model_checked = INFERENCE_BACKEND != 'compact' or COMPACT_MAX_ROWS <= 0
+
+def large_batch_model():
+    """The joblib pipeline for batches above COMPACT_MAX_ROWS in compact mode, or None to stay on the compact engine."""
+    global model, large_batch_model_checked
+    if large_batch_model_checked:
+        return model
+    with large_batch_model_lock:
+        if not large_batch_model_checked:
+            loaded = load_model()
+            if loaded is not None and list(loaded.classes_) != list(compact_model.classes_):
+                print("⚠️ Compact and joblib models were trained separately; large batches stay on the compact engine")
+                loaded = None
+            model = loaded
+            large_batch_model_checked = True
+    return model
 
 # --- 7. OpenAI API Key ---
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# --- 8. Ensure Admin User Exists ---
+# Every LLM call goes through one gateway: pooled client, bounded concurrency,
+# deduplication of identical in-flight prompts and a response cache
+llm = LLMGateway(
+    create_backend(
+        os.getenv('LLM_BACKEND', 'openai'),
+        api_key=openai.api_key,
+        timeout=float(os.getenv('LLM_TIMEOUT_SECONDS', 30)),
+        fake_delay=float(os.getenv('LLM_FAKE_DELAY_SECONDS', 0.05)),
+    ),
+    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+    cache_ttl=float(os.getenv('LLM_CACHE_TTL', 3600)),
+    cache_size=int(os.getenv('LLM_CACHE_SIZE', 1000)),
+    on_upstream=LLM_LATENCY.observe,
+)
+
+# --- 8. Ensure Indexes and Admin User Exist ---
+def ensure_database_indexes():
+    # Unique and compound indexes for every lookup the routes make (declared in db_indexes.py)
+    for collection, names in ensure_indexes(mongo.db).items():
+        for name in names:
+            if name.startswith("FAILED"):
+                print(f"❌ Could not create {collection} index: {name}")
+
+    # Diagnostic mode: explain() each route's query shape and report collection scans
+    if os.getenv('MONGO_QUERY_AUDIT', 'false').lower() == 'true':
+        print_audit(audit_queries(mongo.db))
+
+ensure_database_indexes()
+
 def ensure_admin_user():
     existing_admin = mongo.db.users.find_one({"username": "admin"})
     if not existing_admin:
-        hashed_pw = bcrypt.generate_password_hash("admin123").decode("utf-8")
+        hashed_pw = hasher.hash_inline("admin123")
         mongo.db.users.insert_one({
             "username": "admin",
             "password": hashed_pw,
@@ -61,6 +207,15 @@ def ensure_admin_user():
 
 ensure_admin_user()
 
+def ensure_rating_aggregates():
+    # Backfill running rating aggregates for feedback written before they existed
+    if mongo.db.rating_aggregates.estimated_document_count() == 0 and mongo.db.feedback.estimated_document_count() > 0:
+        count = rebuild_rating_aggregates(mongo.db)
+        print(f"✅ Rating aggregates rebuilt for {count} universities")
+
+ensure_rating_aggregates()
+
+
 # --- 9. Auth Routes ---
 @app.route('/signup', methods=['POST'])
 def signup():
@@ -78,16 +233,23 @@ def signup():
     if mongo.db.users.find_one({'username': username}):
         return jsonify({'error': 'Username already exists'}), 409
 
-    hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
-    mongo.db.users.insert_one({
-        'username': username,
-        'password': hashed_pw,
-        'user_type': user_type,
-        'full_name': full_name,
-        'email': email,
-        'age': age,
-        'city': city
-    })
+    try:
+        hashed_pw = hasher.hash(password)
+    except TimeoutError as e:
+        return jsonify({'error': str(e)}), 503
+    try:
+        mongo.db.users.insert_one({
+            'username': username,
+            'password': hashed_pw,
+            'user_type': user_type,
+            'full_name': full_name,
+            'email': email,
+            'age': age,
+            'city': city
+        })
+    except DuplicateKeyError:
+        # A concurrent signup for the same username got past the check above first
+        return jsonify({'error': 'Username already exists'}), 409
     return jsonify({'message': 'User created successfully'}), 200
 
 @app.route('/login', methods=['POST'])
@@ -97,7 +259,18 @@ def login():
     password = data.get('password')
     user = mongo.db.users.find_one({'username': username})
 
-    if user and bcrypt.check_password_hash(user['password'], password):
+    try:
+        verified = user is not None and hasher.verify(user['password'], password)
+    except TimeoutError as e:
+        return jsonify({'error': str(e)}), 503
+
+    if verified:
+        if hasher.needs_rehash(user['password']):
+            # The cost factor changed since this hash was stored; upgrade it while we have the password
+            try:
+                mongo.db.users.update_one({"_id": user['_id']}, {"$set": {"password": hasher.hash(password)}})
+            except TimeoutError:
+                pass  # Try again on the next login
         user_data = {
             "username": user['username'],
             "user_type": user['user_type'],
@@ -106,16 +279,28 @@ def login():
             "age": user.get('age'),
             "city": user.get('city')
         }
-        return jsonify({'message': 'Login successful', 'user': user_data}), 200
+        token = session_tokens.issue({**user, "_id": str(user['_id'])})
+        return jsonify({'message': 'Login successful', 'user': user_data, 'token': token}), 200
     else:
         return jsonify({'error': 'Invalid username or password'}), 401
 
 # --- 10. User Profile Routes ---
+def session_user(username):
+    """Profile carried by a valid Bearer session token for `username`, or None."""
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer '):
+        return None
+    user = session_tokens.verify(auth[len('Bearer '):])
+    return user if user and user.get('username') == username else None
+
 @app.route('/api/user/profile', methods=['GET'])
 def get_profile():
     username = request.args.get('username')
     if not username:
         return jsonify({"error": "Username is required"}), 400
+    user = session_user(username)
+    if user:
+        return jsonify(user), 200
     user = mongo.db.users.find_one({"username": username}, {"password": 0})
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -129,6 +314,10 @@ def update_profile():
     if not username:
         return jsonify({"error": "Username is required"}), 400
     mongo.db.users.update_one({"username": username}, {"$set": data})
+    user = session_user(username)
+    if user:
+        # Hand back a token with the new values so the next profile read stays off the database
+        return jsonify({"message": "Profile updated successfully", "token": session_tokens.issue({**user, **data})}), 200
     return jsonify({"message": "Profile updated successfully"}), 200
 
 @app.route('/api/user/delete', methods=['DELETE'])
@@ -140,43 +329,343 @@ def delete_profile():
     return jsonify({"message": "User deleted successfully"}), 200
 
 # --- 11. University Recommendation API ---
+MAX_PREDICT_BATCH = int(os.getenv('MAX_PREDICT_BATCH', 10000))
+MAX_TOP_K = int(os.getenv('MAX_TOP_K', 20))
+PREDICT_MICROBATCH = os.getenv('PREDICT_MICROBATCH', 'true').lower() == 'true'
+
+def profiles_to_frame(profiles):
+    """Build one DataFrame for a list of student profiles in the column order the model was fitted on."""
+    input_df = pd.DataFrame.from_records(profiles)
+    feature_names = getattr(predictor, 'feature_names_in_', None)
+    if feature_names is not None:
+        input_df = input_df.reindex(columns=feature_names)
+    return input_df
+
+def predict_proba_profiles(profiles):
+    backend, engine = INFERENCE_BACKEND, predictor
+    if backend == 'compact' and 0 < COMPACT_MAX_ROWS < len(profiles) and large_batch_model() is not None:
+        backend, engine = 'sklearn', model
+    with MODEL_LATENCY.time(backend):
+        if backend == 'compact':
+            return engine.predict_proba(profiles)
+        return engine.predict_proba(profiles_to_frame(profiles))
+
+def predict_profiles(profiles):
+    """Score a batch of profiles with a single vectorized predict_proba call."""
+    probabilities = predict_proba_profiles(profiles)
+    best = probabilities.argmax(axis=1)
+    university_ids = predictor.classes_[best].tolist()
+    scores = probabilities[range(len(best)), best].tolist()
+    return university_ids, scores
+
+# Concurrent single-profile requests are coalesced into one model call
+predict_batcher = MicroBatcher(
+    lambda profiles: list(zip(*predict_profiles(profiles))),
+    window_ms=float(os.getenv('PREDICT_BATCH_WINDOW_MS', 2)),
+    max_batch=int(os.getenv('PREDICT_BATCH_MAX_ROWS', 64)),
+)
+
+# Repeated profiles are answered from memory, keyed on the models loaded above
+prediction_cache = PredictionCache(
+    predictor.feature_names_in_ if predictor is not None else [],
+    maxsize=int(os.getenv('PREDICTION_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.getenv('PREDICTION_CACHE_TTL', 3600)),
+    budget_bucket=float(os.getenv('PREDICTION_BUDGET_BUCKET', 0)),
+    model_hash=hashlib.sha256(json.dumps(MODEL_FINGERPRINTS, sort_keys=True).encode()).hexdigest()[:16],
+)
+
+def top_k_indices(probabilities, k):
+    """
+    Column indices of the k largest probabilities per row, best first, without
+    a full sort. Ties go to the lower column index, as in a stable argsort of
+    the whole row; forest probabilities tie often (every class no tree voted
+    for is 0.0), so columns tied with the k-th score are taken in index order
+    rather than whichever ones a partition happens to leave in front.
+    """
+    k = min(k, probabilities.shape[1])
+    kth = -np.partition(-probabilities, k - 1, axis=1)[:, k - 1:k]
+    above = probabilities > kth
+    tied = probabilities == kth
+    selected = above | (tied & (np.cumsum(tied, axis=1) <= k - above.sum(axis=1, keepdims=True)))
+    candidates = np.nonzero(selected)[1].reshape(-1, k)
+    candidate_scores = np.take_along_axis(probabilities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+def predict_top_k(profiles, k):
+    """Return, per profile, the k best (university_id, probability) pairs."""
+    probabilities = predict_proba_profiles(profiles)
+    best = top_k_indices(probabilities, k)
+    ranked_ids = predictor.classes_[best].tolist()
+    ranked_scores = np.take_along_axis(probabilities, best, axis=1).tolist()
+    return [list(zip(ids, scores)) for ids, scores in zip(ranked_ids, ranked_scores)]
+
+def clamp_top_k(top_k):
+    if top_k is None:
+        return None
+    top_k = int(top_k)
+    if top_k < 1:
+        raise ValueError('top_k must be a positive integer')
+    return min(top_k, MAX_TOP_K)
+
+def parse_top_k(data=None):
+    """Read top_k from the query string or the request body; None means single-id mode."""
+    top_k = request.args.get('top_k')
+    if top_k is None and isinstance(data, dict):
+        top_k = data.pop('top_k', None)
+    return clamp_top_k(top_k)
+
+def read_batch_profiles():
+    """
+    Read profiles from a JSON array, a {"students": [...]} object or an
+    NDJSON body. An NDJSON line that is not valid JSON becomes a ValueError
+    in its slot, so it fails only its own row.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        profiles = []
+        for number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if line:
+                try:
+                    profiles.append(json.loads(line))
+                except ValueError as e:
+                    profiles.append(ValueError(f"Invalid JSON on line {number}: {e}"))
+        return profiles
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get('students')
+    return data
+
+def batch_row_error(profile):
+    """Why a batch row cannot be scored, or None; checked up front so one bad row does not fail the batch."""
+    if isinstance(profile, Exception):
+        return str(profile)
+    if not isinstance(profile, dict):
+        return 'Expected a student profile object'
+    for column in prediction_cache.feature_columns:
+        value = profile.get(column)
+        if value is None or value != value:
+            return f"Missing value for feature '{column}'"
+    return None
+
+def score_profiles(profiles, top_k=None):
+    """(university_id, score) per profile, or the top_k ranking per profile."""
+    if top_k is not None:
+        return predict_top_k(profiles, top_k)
+    return list(zip(*predict_profiles(profiles)))
+
+def cached_top_k(profile, top_k):
+    """The top_k ranking for a normalized profile; returns (cache_key, ranked or None on a miss)."""
+    cache_key = prediction_cache.key(profile, ('top_k', top_k))
+    return cache_key, prediction_cache.get(cache_key)
+
+def top_k_payload(ranked, universities):
+    """Recommendation payload for a ranking, joined with {university_id: document}."""
+    recommendations = [
+        {'university_id': university_id, 'score': score, 'university': universities.get(university_id)}
+        for university_id, score in ranked
+    ]
+    return {'recommended_university_id': ranked[0][0], 'recommendations': recommendations}
+
+def recommend(data, top_k=None):
+    """
+    Recommendation payload for one profile, served from the prediction cache
+    when possible. asgi.py has the async twin of this function.
+    """
+    profile = prediction_cache.normalize(data)
+    if top_k is not None:
+        cache_key, ranked = cached_top_k(profile, top_k)
+        if ranked is None:
+            ranked = predict_top_k([profile], top_k)[0]
+            prediction_cache.put(cache_key, ranked)
+        ranked_ids = [university_id for university_id, _ in ranked]
+        universities = {
+            u['university_id']: u
+            for u in mongo.db.universities.find({"university_id": {"$in": ranked_ids}}, {"_id": 0})
+        }
+        return top_k_payload(ranked, universities)
+
+    cache_key = prediction_cache.key(profile)
+    result = prediction_cache.get(cache_key)
+    if result is None:
+        if PREDICT_MICROBATCH:
+            result = predict_batcher.submit(profile, timeout=30)
+        else:
+            university_ids, scores = predict_profiles([profile])
+            result = (university_ids[0], scores[0])
+        prediction_cache.put(cache_key, result)
+    return {'recommended_university_id': result[0]}
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
-    if model is None:
+    if predictor is None:
         return jsonify({'error': 'Model not loaded'}), 500
     try:
         data = request.get_json()
-        input_df = pd.DataFrame(data, index=[0])
-        prediction = model.predict(input_df)
-        predicted_university_id = prediction[0]
-        return jsonify({'recommended_university_id': predicted_university_id}), 200
+        top_k = parse_top_k(data)
+        return jsonify(recommend(data, top_k)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    if predictor is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    try:
+        profiles = read_batch_profiles()
+        if not isinstance(profiles, list):
+            return jsonify({'error': 'Expected a list of student profiles'}), 400
+        if len(profiles) > MAX_PREDICT_BATCH:
+            return jsonify({'error': f'Batch size exceeds limit of {MAX_PREDICT_BATCH}'}), 413
+        if not profiles:
+            return jsonify({'recommendations': [], 'count': 0, 'errors': 0}), 200
+
+        top_k = parse_top_k()
+        variant = ('top_k', top_k) if top_k is not None else None
+        results = [None] * len(profiles)
+        cache_keys = {}
+        normalized = {}
+        for i, profile in enumerate(profiles):
+            error = batch_row_error(profile)
+            if error is not None:
+                results[i] = ValueError(error)
+                continue
+            normalized[i] = prediction_cache.normalize(profile)
+            cache_keys[i] = prediction_cache.key(normalized[i], variant)
+            results[i] = prediction_cache.get(cache_keys[i])
+
+        # Only cache misses go through the model, still as a single vectorized call
+        missing = [i for i in cache_keys if results[i] is None]
+        if missing:
+            misses = [normalized[i] for i in missing]
+            try:
+                computed = score_profiles(misses, top_k)
+            except Exception:
+                # A value the model rejects (e.g. a non-numeric budget): find the row, score the rest
+                computed = []
+                for profile in misses:
+                    try:
+                        computed.append(score_profiles([profile], top_k)[0])
+                    except Exception as e:
+                        computed.append(e)
+            for i, result in zip(missing, computed):
+                results[i] = result
+                if not isinstance(result, Exception):
+                    prediction_cache.put(cache_keys[i], result)
+
+        recommendations = []
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                recommendations.append({'row': i, 'error': str(result)})
+            elif top_k is not None:
+                recommendations.append({
+                    'recommended_university_id': result[0][0],
+                    'score': result[0][1],
+                    'top_k': [{'university_id': university_id, 'score': score} for university_id, score in result]
+                })
+            else:
+                recommendations.append({'recommended_university_id': result[0], 'score': result[1]})
+
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            body = "".join(json.dumps(item) + "\n" for item in recommendations)
+            return Response(body, status=200, mimetype='application/x-ndjson')
+        errors = sum('error' in item for item in recommendations)
+        return jsonify({'recommendations': recommendations, 'count': len(recommendations), 'errors': errors}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/predict/stats', methods=['GET'])
+def predict_stats():
+    return jsonify({
+        'inference_backend': INFERENCE_BACKEND,
+        'microbatching': PREDICT_MICROBATCH,
+        'batcher': predict_batcher.stats(),
+        'cache': prediction_cache.stats(),
+        'compact_model': compact_model.describe() if compact_model is not None else None
+    }), 200
+
 # --- 12. University Routes ---
+MAX_SEARCH_PAGE_SIZE = int(os.getenv('MAX_SEARCH_PAGE_SIZE', 100))
+LISTING_PAGE_SIZE = int(os.getenv('LISTING_PAGE_SIZE', 50))
+MAX_LISTING_PAGE_SIZE = int(os.getenv('MAX_LISTING_PAGE_SIZE', 500))
+
+catalogue = CatalogueIndex(
+    lambda: mongo.db.universities.find({}, {"_id": 0}),
+    refresh_seconds=float(os.getenv('CATALOGUE_REFRESH_SECONDS', 300)),
+    version_reader=lambda: read_stored_version(mongo.db.catalogue_state),
+    version_bumper=lambda: bump_stored_version(mongo.db.catalogue_state),
+    check_seconds=float(os.getenv('CATALOGUE_VERSION_CHECK_SECONDS', 1)),
+)
+
+def catalogue_listing_response():
+    """
+    Serve the university catalogue from the in-memory snapshot. Without
+    parameters the full pre-serialized list is returned; `limit`/`cursor`
+    switch to keyset pagination and `fields` projects each document.
+    Responses carry an ETag so unchanged catalogues answer 304.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    fields = request.args.get('fields')
+    snapshot_etag, body, _, docs = catalogue.snapshot()
+
+    etag = snapshot_etag
+    if limit or cursor or fields:
+        etag = f"{snapshot_etag}-{hashlib.sha1(request.query_string).hexdigest()[:12]}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    if not (limit or cursor or fields):
+        response = Response(body, status=200, mimetype='application/json')
+    else:
+        projection = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+        if limit or cursor:
+            try:
+                page_size = min(max(int(limit or LISTING_PAGE_SIZE), 1), MAX_LISTING_PAGE_SIZE)
+            except ValueError:
+                return jsonify({"error": "limit must be an integer"}), 400
+            items, next_cursor = catalogue.page(cursor, page_size)
+        else:
+            items, next_cursor = docs, None
+        if projection:
+            items = [{field: doc[field] for field in projection if field in doc} for doc in items]
+        payload = {"items": items, "next_cursor": next_cursor} if (limit or cursor) else items
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/universities', methods=['GET'])
 def get_universities():
-    universities = list(mongo.db.universities.find({}, {"_id": 0}))
-    return jsonify(universities), 200
+    return catalogue_listing_response()
 
 @app.route('/api/universities/search', methods=['GET'])
 def search_universities():
     query = request.args.get('q', '')
     if not query:
         return jsonify([]), 200
-    
-    # Use case-insensitive regex search on the 'name' field
-    # The 're.compile' and 're.IGNORECASE' make it case-insensitive
-    regex_pattern = re.compile(f".*{re.escape(query)}.*", re.IGNORECASE)
-    
-    universities = list(mongo.db.universities.find({"name": {"$regex": regex_pattern}}, {"_id": 0}))
-    return jsonify(universities), 200
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        # Without a limit every match is returned; SearchComponent shows them all and does not page
+        limit = request.args.get('limit')
+        limit = min(max(int(limit), 1), MAX_SEARCH_PAGE_SIZE) if limit is not None else None
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    # Served from the in-memory n-gram index instead of an unindexable $regex scan
+    total, universities = catalogue.search(query, offset=offset, limit=limit)
+    response = jsonify(universities)
+    response.headers['X-Total-Count'] = str(total)
+    return response, 200
 
 # --- 13. Admin Routes ---
+CATALOGUE_IMPORT_CHUNK_SIZE = int(os.getenv('CATALOGUE_IMPORT_CHUNK_SIZE', 20000))
+
 @app.route('/api/admin/universities', methods=['GET'])
 def get_admin_universities():
-    universities = list(mongo.db.universities.find({}, {"_id": 0}))
-    return jsonify(universities), 200
+    return catalogue_listing_response()
 
 @app.route('/api/admin/universities', methods=['POST'])
 def add_university():
@@ -186,15 +675,51 @@ def add_university():
         return jsonify({"error": "Missing required university fields"}), 400
     if mongo.db.universities.find_one({"university_id": data['university_id']}):
         return jsonify({"error": "University ID already exists"}), 409
-    mongo.db.universities.insert_one(data)
+    try:
+        mongo.db.universities.insert_one(data)
+    except DuplicateKeyError:
+        return jsonify({"error": "University ID already exists"}), 409
+    catalogue.upsert(data)
     return jsonify({"message": "University added successfully"}), 201
 
+@app.route('/api/admin/universities/import', methods=['POST'])
+def import_universities():
+    """
+    Reloads the catalogue from a degrees CSV: an uploaded `file`, a text/csv
+    request body, or, with neither, the bundled CSV. The upload is parsed in
+    chunks straight from the request stream (see ingest.py).
+    """
+    if 'file' in request.files:
+        source = request.files['file'].stream
+    elif request.mimetype == 'text/csv':
+        source = request.stream
+    else:
+        source = os.getenv('CATALOGUE_CSV_PATH', DEFAULT_CSV_PATH)
+    try:
+        chunk_size = int(request.args.get('chunk_size', CATALOGUE_IMPORT_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({"error": "chunk_size must be an integer"}), 400
+
+    try:
+        report = ingest_catalogue(mongo.db, source, chunk_size=max(chunk_size, 1))
+    except ValueError as e:
+        # Missing columns or an unparseable file
+        return jsonify({"error": f"Invalid catalogue CSV: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error importing universities: {str(e)}"}), 500
+    catalogue.refresh()
+    return jsonify({"message": "Universities imported", **report}), 200
+
 @app.route('/api/admin/universities/<university_id>', methods=['PUT'])
 def update_university(university_id):
     data = request.get_json()
     result = mongo.db.universities.update_one({"university_id": university_id}, {"$set": data})
     if result.matched_count == 0:
         return jsonify({"error": "University not found"}), 404
+    updated = mongo.db.universities.find_one({"university_id": data.get('university_id', university_id)}, {"_id": 0})
+    catalogue.remove(university_id)
+    if updated:
+        catalogue.upsert(updated)
     return jsonify({"message": "University updated successfully"}), 200
 
 @app.route('/api/admin/universities/<university_id>', methods=['DELETE'])
@@ -202,6 +727,7 @@ def delete_university(university_id):
     result = mongo.db.universities.delete_one({"university_id": university_id})
     if result.deleted_count == 0:
         return jsonify({"error": "University not found"}), 404
+    catalogue.remove(university_id)
     return jsonify({"message": "University deleted successfully"}), 200
 
 # --- 14. OpenAI Chat Route ---
@@ -211,21 +737,137 @@ def chat_with_openai():
     prompt = data.get('prompt')
     if not prompt:
         return jsonify({"error": "Prompt is required"}), 400
+
+    # Streaming mode: relay completion chunks as Server-Sent Events
+    if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+        return Response(
+            stream_with_context(chat_event_stream(prompt)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
     try:
-        client = openai.OpenAI(api_key=openai.api_key)
-        response = client.chat.completions.create(
+        answer = llm.complete(
+            [{"role": "user", "content": prompt}],
             model="gpt-4-turbo",
-            messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=500
         )
-        answer = response.choices[0].message.content
         return jsonify({"response": answer}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+def chat_event_stream(prompt):
+    """SSE body for a chat completion; closing it (client disconnect) closes the upstream stream."""
+    chunks = llm.stream([{"role": "user", "content": prompt}], model="gpt-4-turbo", temperature=0.7, max_tokens=500)
+    try:
+        for chunk in chunks:
+            yield f"data: {json.dumps({'delta': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    finally:
+        chunks.close()
+
+@app.route('/api/llm/stats', methods=['GET'])
+def llm_stats():
+    return jsonify(llm.stats()), 200
+
 # --- 15. New Route: Get Latest University Info ---
+UNIVERSITY_INFO_TTL = float(os.getenv('UNIVERSITY_INFO_TTL_HOURS', 24)) * 3600
+
+# Scraping and summarizing run in the background so request workers never wait on external I/O
+info_jobs = JobQueue(max_workers=int(os.getenv('UNIVERSITY_INFO_WORKERS', 4)))
+
+# One pooled HTTP client shared by every scrape, with per-host limits and a byte cap per page
+scraper = Scraper(
+    max_workers=int(os.getenv('SCRAPE_WORKERS', 8)),
+    per_host=int(os.getenv('SCRAPE_PER_HOST', 2)),
+    max_bytes=int(os.getenv('SCRAPE_MAX_BYTES', 2 * 1024 * 1024)),
+    budget=3000,
+)
+if METRICS_ENABLED:
+    scraper.session.hooks['response'].append(outbound_response_hook(OUTBOUND_LATENCY))
+SCRAPE_DEADLINE = float(os.getenv('SCRAPE_DEADLINE_SECONDS', 8))
+
+def build_summary_prompt(university, text_content):
+    """Summary prompt for the scraped text, or for generic info when nothing could be fetched."""
+    # --- If no content found, generate generic AI info ---
+    if not text_content:
+        text_content = f"Provide a professional summary about {university.get('name')}, a university located in {university.get('location', 'Sri Lanka')}, with a ranking of {university.get('ranking', 'unknown')}."
+
+    return f"""
+    You are an assistant that provides concise and professional university information.
+    Based on the following extracted content, give a short and updated summary about the university in 2-3 paragraphs:
+
+    {text_content}
+    """
+
+def generate_university_summary(university):
+    """Scrape the university's website (or search results) and summarize it with OpenAI."""
+    university_name = university.get("name")
+    website = university.get('website')
+
+    text_content = ""
+
+    # --- Try fetching the website first ---
+    if website:
+        try:
+            text_content = scraper.fetch_text(website, timeout=10)
+        except requests.exceptions.RequestException:
+            text_content = ""  # Ignore website fetch errors
+
+    # --- If website fetch failed, fetch the Google results concurrently ---
+    if not text_content:
+        try:
+            search_results = list(search(f"{university_name} official website", num_results=3))
+            text_content = scraper.gather_text(search_results, timeout=5, deadline=SCRAPE_DEADLINE)
+        except Exception:
+            text_content = ""  # Ignore Google fetch errors
+
+    # --- OpenAI summary generation ---
+    answer = llm.complete(
+        [{"role": "user", "content": build_summary_prompt(university, text_content)}],
+        model="gpt-4-turbo",
+        temperature=0.6,
+        max_tokens=500
+    ).strip()
+
+    return answer
+
+def refresh_university_info(university):
+    """Background job: build a fresh summary and store it per university_id."""
+    answer = generate_university_summary(university)
+    info = {
+        "university_id": university['university_id'],
+        "university_name": university.get('name'),
+        "updated_info": answer,
+        "fetched_at": datetime.now()
+    }
+    mongo.db.university_info.update_one({"university_id": info['university_id']}, {"$set": info}, upsert=True)
+    return info_payload(info)
+
+def info_payload(info, cached=False):
+    return {
+        "university_id": info['university_id'],
+        "university_name": info.get('university_name'),
+        "updated_info": info['updated_info'],
+        "fetched_at": info['fetched_at'].isoformat(),
+        "cached": cached
+    }
+
+def fresh_university_info(university_id):
+    info = mongo.db.university_info.find_one({"university_id": university_id}, {"_id": 0})
+    if info and (datetime.now() - info['fetched_at']).total_seconds() < UNIVERSITY_INFO_TTL:
+        return info
+    return None
+
 @app.route('/api/university/update-info', methods=['POST'])
 def get_updated_university_info():
+    """
+    Returns the stored summary when it is fresher than the TTL; otherwise
+    queues a refresh job and answers 202 with a job_id to poll.
+    """
     try:
         data = request.get_json()
         university_id = data.get('university_id')
@@ -233,81 +875,37 @@ def get_updated_university_info():
         if not university_id:
             return jsonify({"error": "University ID is required"}), 400
 
-        university = mongo.db.universities.find_one({"university_id": university_id})
+        if not data.get('force'):
+            info = fresh_university_info(university_id)
+            if info:
+                return jsonify(info_payload(info, cached=True)), 200
+
+        university = mongo.db.universities.find_one({"university_id": university_id}, {"_id": 0})
         if not university:
             return jsonify({"error": "University not found"}), 404
 
-        university_name = university.get("name")
-        website = university.get('website')
-
-        text_content = ""
-
-        # --- Try fetching the website first ---
-        if website:
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-            try:
-                res = requests.get(website, headers=headers, timeout=10)
-                res.raise_for_status()
-                soup = BeautifulSoup(res.text, 'html.parser')
-                content_blocks = []
-                for tag in soup.find_all(['p', 'h1', 'h2', 'h3']):
-                    text = tag.get_text(strip=True)
-                    if text:
-                        content_blocks.append(text)
-                text_content = " ".join(content_blocks)[:3000]  # Limit for OpenAI
-            except requests.exceptions.RequestException:
-                text_content = ""  # Ignore website fetch errors
-
-        # --- If website fetch failed, try Google search ---
-        if not text_content:
-            try:
-                search_results = list(search(f"{university_name} official website", num_results=3))
-                google_texts = []
-                for url in search_results:
-                    try:
-                        res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
-                        res.raise_for_status()
-                        soup = BeautifulSoup(res.text, 'html.parser')
-                        for tag in soup.find_all(['p', 'h1', 'h2', 'h3']):
-                            text = tag.get_text(strip=True)
-                            if text:
-                                google_texts.append(text)
-                    except:
-                        continue
-                text_content = " ".join(google_texts)[:3000]
-            except:
-                text_content = ""  # Ignore Google fetch errors
-
-        # --- If no content found, generate generic AI info ---
-        if not text_content:
-            text_content = f"Provide a professional summary about {university_name}, a university located in {university.get('location', 'Sri Lanka')}, with a ranking of {university.get('ranking', 'unknown')}."
-
-        # --- OpenAI summary generation ---
-        prompt = f"""
-        You are an assistant that provides concise and professional university information.
-        Based on the following extracted content, give a short and updated summary about the university in 2-3 paragraphs:
-
-        {text_content}
-        """
-
-        response = openai.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.6,
-            max_tokens=500
-        )
-
-        answer = response.choices[0].message.content.strip()
-
-        return jsonify({
-            "university_id": university_id,
-            "university_name": university_name,
-            "updated_info": answer
-        }), 200
+        job = info_jobs.submit(university_id, refresh_university_info, university)
+        return jsonify({"job_id": job['job_id'], "status": job['status'], "university_id": university_id}), 202
 
     except Exception as e:
         return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
 
+@app.route('/api/university/update-info/<job_id>', methods=['GET'])
+def get_university_info_job(job_id):
+    job = info_jobs.get(job_id)
+    if job is None:
+        # The job may have run in another worker process; fall back to the stored summary
+        university_id = request.args.get('university_id')
+        info = fresh_university_info(university_id) if university_id else None
+        if info:
+            return jsonify({"job_id": job_id, "status": "done", **info_payload(info, cached=True)}), 200
+        return jsonify({"error": "Job not found"}), 404
+    if job['status'] == 'done':
+        return jsonify({"job_id": job_id, "status": "done", **job['result']}), 200
+    if job['status'] == 'failed':
+        return jsonify({"job_id": job_id, "status": "failed", "error": job['error']}), 500
+    return jsonify({"job_id": job_id, "status": job['status']}), 202
+
 @app.route('/api/bookings', methods=['POST'])
 def add_booking():
     data = request.get_json()
@@ -332,90 +930,179 @@ def submit_rating():
     required_fields = ['user_email', 'university_id', 'rating']
     if not all(field in data for field in required_fields):
         return jsonify({"error": "Missing required fields: user_email, university_id, and rating"}), 400
-
     try:
-        # Check if the user has already rated this university using their email
-        existing_rating = mongo.db.feedback.find_one({
-            "user_email": data['user_email'],
-            "university_id": data['university_id']
-        })
+        validate_rating(data['rating'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        if existing_rating:
-            # Update the existing rating
-            mongo.db.feedback.update_one(
-                {"_id": existing_rating["_id"]},
-                {"$set": {"rating": data['rating'], "timestamp": datetime.now()}}
+    try:
+        rating_filter = {"user_email": data['user_email'], "university_id": data['university_id']}
+        # The same timestamp goes to the aggregate, so a rebuild that already counted this write skips it
+        now = datetime.now()
+        rating_update = {"$set": {"rating": data['rating'], "timestamp": now}}
+        try:
+            # Single upsert; the pre-image tells a new rating apart from a changed one
+            previous = mongo.db.feedback.find_one_and_update(
+                rating_filter, rating_update, projection={"rating": 1},
+                upsert=True, return_document=ReturnDocument.BEFORE
             )
+        except DuplicateKeyError:
+            # A concurrent upsert for the same user and university won the insert; this one is now an update
+            previous = mongo.db.feedback.find_one_and_update(
+                rating_filter, rating_update, projection={"rating": 1}, return_document=ReturnDocument.BEFORE
+            )
+
+        if previous:
+            apply_rating_change(mongo.db, data['university_id'], previous['rating'], data['rating'], as_of=now)
             return jsonify({"message": "Rating updated successfully"}), 200
-        else:
-            # Insert a new rating
-            new_rating = {
-                "user_email": data['user_email'],
-                "university_id": data['university_id'],
-                "rating": data['rating'],
-                "timestamp": datetime.now()
-            }
-            mongo.db.feedback.insert_one(new_rating)
-            return jsonify({"message": "Rating submitted successfully"}), 201
+        apply_rating_change(mongo.db, data['university_id'], new_rating=data['rating'], as_of=now)
+        return jsonify({"message": "Rating submitted successfully"}), 201
 
     except Exception as e:
         return jsonify({"error": f"Error submitting rating: {str(e)}"}), 500
 
+@app.route('/api/admin/feedback/import', methods=['POST'])
+def import_ratings():
+    """
+    Bulk-loads ratings from a JSON list (or {"ratings": [...]}) with one
+    unordered bulk_write of upserts, then rebuilds the affected aggregates.
+    """
+    data = request.get_json()
+    ratings = data.get('ratings') if isinstance(data, dict) else data
+    if not isinstance(ratings, list):
+        return jsonify({"error": "Expected a list of ratings"}), 400
+
+    required_fields = ['user_email', 'university_id', 'rating']
+    now = datetime.now()
+    operations = []
+    university_ids = set()
+    invalid = 0
+    for item in ratings:
+        if not isinstance(item, dict) or not all(field in item for field in required_fields):
+            invalid += 1
+            continue
+        try:
+            validate_rating(item['rating'])
+        except ValueError:
+            invalid += 1
+            continue
+        operations.append(UpdateOne(
+            {"user_email": item['user_email'], "university_id": item['university_id']},
+            {"$set": {"rating": item['rating'], "timestamp": now}},
+            upsert=True
+        ))
+        university_ids.add(item['university_id'])
+    if not operations:
+        return jsonify({"error": "No valid ratings to import", "invalid": invalid}), 400
+
+    try:
+        errors = 0
+        try:
+            result = mongo.db.feedback.bulk_write(operations, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            errors = len(result.get('writeErrors', []))
+        rebuild_rating_aggregates(mongo.db, university_ids)
+        return jsonify({
+            "message": "Ratings imported",
+            "inserted": result.get('nUpserted', 0),
+            "updated": result.get('nModified', 0),
+            "invalid": invalid,
+            "errors": errors
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Error importing ratings: {str(e)}"}), 500
+
 
 @app.route('/api/feedback/average-rating/<university_id>', methods=['GET'])
 def get_average_rating(university_id):
     try:
-        ratings = list(mongo.db.feedback.find({"university_id": university_id}))
-        
-        if not ratings:
-            return jsonify({"average_rating": 0, "count": 0}), 200
-            
-        total_rating = sum(r['rating'] for r in ratings)
-        count = len(ratings)
-        average = total_rating / count
-        
+        # Read from the running aggregate instead of scanning every feedback document
+        summary = read_rating_aggregates(mongo.db, [university_id])[university_id]
         return jsonify({
-            "average_rating": average,
-            "count": count
+            "average_rating": summary['average_rating'],
+            "count": summary['count']
         }), 200
 
     except Exception as e:
         return jsonify({"error": f"Error calculating average rating: {str(e)}"}), 500
 
+@app.route('/api/feedback/average-ratings', methods=['GET', 'POST'])
+def get_average_ratings():
+    """
+    Returns rating summaries for many universities in one call, either from
+    ?ids=a,b,c or a JSON body {"university_ids": [...]}.
+    """
+    if request.method == 'POST':
+        university_ids = (request.get_json() or {}).get('university_ids')
+    else:
+        university_ids = [uid for uid in request.args.get('ids', '').split(',') if uid]
+    if not isinstance(university_ids, list) or not university_ids:
+        return jsonify({"error": "university_ids is required"}), 400
+
+    try:
+        return jsonify(read_rating_aggregates(mongo.db, university_ids)), 200
+    except Exception as e:
+        return jsonify({"error": f"Error calculating average ratings: {str(e)}"}), 500
+
+MAX_EXPORT_PAGE_SIZE = int(os.getenv('MAX_EXPORT_PAGE_SIZE', 10000))
+
+def export_response(collection, date_field, columns, filename):
+    """
+    Stream a collection export from the Mongo cursor in json (default),
+    ndjson or csv, filtered by university_id and from/to dates and paged
+    with limit/after.
+    """
+    try:
+        query, limit, export_format = build_export_query(request.args, date_field, MAX_EXPORT_PAGE_SIZE, collection)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cursor = collection.find(query).sort(export_sort(date_field)).batch_size(EXPORT_BATCH_SIZE)
+    if limit:
+        cursor = cursor.limit(limit)
+    response = Response(
+        stream_with_context(stream_export(cursor, export_format, columns)),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    if export_format == 'csv':
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}.csv'
+    return response
+
 @app.route('/api/admin/bookings', methods=['GET'])
 def get_all_bookings():
     """
-    Retrieves all booking records from the database.
+    Streams booking records from the database.
     """
     try:
-        bookings = list(mongo.db.booking.find({}))
-        for booking in bookings:
-            booking['_id'] = str(booking['_id'])
-            booking['booking_date'] = booking['booking_date'].isoformat()
-        return jsonify(bookings), 200
+        return export_response(
+            mongo.db.booking, 'booking_date', ['_id', 'user_email', 'university_id', 'booking_date'], 'bookings'
+        )
     except Exception as e:
         return jsonify({"error": f"Error fetching bookings: {str(e)}"}), 500
 
 @app.route('/api/admin/feedback', methods=['GET'])
 def get_all_feedback():
     """
-    Retrieves all feedback records from the database.
+    Streams feedback records from the database.
     """
     try:
-        feedback = list(mongo.db.feedback.find({}))
-        for item in feedback:
-            item['_id'] = str(item['_id'])
-            item['timestamp'] = item['timestamp'].isoformat()
-        return jsonify(feedback), 200
+        return export_response(
+            mongo.db.feedback, 'timestamp', ['_id', 'user_email', 'university_id', 'rating', 'timestamp'], 'feedback'
+        )
     except Exception as e:
         return jsonify({"error": f"Error fetching feedback: {str(e)}"}), 500
 
 
-# --- 16. Root Endpoint ---
+# --- 16. Root and Metrics Endpoints ---
 @app.route('/')
 def home():
     return "<h1>University Recommendation API</h1><p>Server is running.</p>"
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Prometheus text exposition format; each worker process reports its own series
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # --- 17. Run App ---
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+# `python app.py` starts the dev server from the top of this file
\ No newline at end of file
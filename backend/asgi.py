@@ -0,0 +1,301 @@
+# asgi.py
+# Production serving mode: the same API behind an ASGI server.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+#
+# Routes that wait on external I/O (prediction, chat, update-info, rating
+# reads) are served natively on the event loop with Motor, httpx and the
+# async OpenAI client. Everything else is the unchanged Flask app, mounted
+# behind a WSGI bridge that runs it on a thread pool.
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import httpx
+from a2wsgi import WSGIMiddleware
+from googlesearch import search
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as backend
+from jobs import AsyncJobQueue
+from ratings import aread_rating_aggregates
+from scraper import AsyncScraper
+
+# --- Worker Model ---
+# Each uvicorn worker process runs one event loop plus two thread pools:
+# INFERENCE_THREADS for model scoring that bypasses the micro-batcher (top_k,
+# or PREDICT_MICROBATCH=false; NumPy releases the GIL in the heavy loops)
+# and WSGI_THREADS for the Flask routes that are still synchronous.
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', 4))
+WSGI_THREADS = int(os.getenv('WSGI_THREADS', 16))
+
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="inference")
+
+
+def json_response(payload, status=200, headers=None):
+    return Response(json.dumps(payload, default=str), status_code=status, headers=headers, media_type="application/json")
+
+
+async def run_inference(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(inference_pool, fn, *args)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    client = AsyncIOMotorClient(
+        os.getenv('MONGO_URI'), event_listeners=[backend.mongo_timer] if backend.METRICS_ENABLED else []
+    )
+    app.state.db = client.get_default_database()
+    app.state.scraper = AsyncScraper(
+        max_connections=int(os.getenv('SCRAPE_WORKERS', 8)),
+        per_host=int(os.getenv('SCRAPE_PER_HOST', 2)),
+        max_bytes=int(os.getenv('SCRAPE_MAX_BYTES', 2 * 1024 * 1024)),
+        budget=3000,
+    )
+    app.state.info_jobs = AsyncJobQueue(max_concurrency=int(os.getenv('UNIVERSITY_INFO_WORKERS', 4)))
+    print(f"✅ ASGI worker {os.getpid()} ready ({INFERENCE_THREADS} inference threads, {WSGI_THREADS} WSGI threads)")
+    try:
+        yield
+    finally:
+        await app.state.scraper.aclose()
+        client.close()
+        inference_pool.shutdown(wait=False)
+
+
+# --- University Recommendation API ---
+async def predict(request):
+    if backend.predictor is None:
+        return json_response({'error': 'Model not loaded'}, 500)
+    try:
+        data = await request.json()
+        top_k = request.query_params.get('top_k')
+        if top_k is None and isinstance(data, dict):
+            top_k = data.pop('top_k', None)
+        top_k = backend.clamp_top_k(top_k)
+        return json_response(await recommend(request.app.state.db, data, top_k), 200)
+    except Exception as e:
+        return json_response({'error': str(e)}, 400)
+
+
+async def recommend(db, data, top_k=None):
+    """
+    Async twin of app.recommend(). The catalogue join runs on Motor, and
+    single-profile scoring awaits the micro-batcher's future, so a batch can
+    hold as many rows as there are waiting requests, not INFERENCE_THREADS.
+    """
+    cache = backend.prediction_cache
+    profile = cache.normalize(data)
+    if top_k is not None:
+        cache_key, ranked = backend.cached_top_k(profile, top_k)
+        if ranked is None:
+            ranked = (await run_inference(backend.predict_top_k, [profile], top_k))[0]
+            cache.put(cache_key, ranked)
+        ranked_ids = [university_id for university_id, _ in ranked]
+        cursor = db.universities.find({"university_id": {"$in": ranked_ids}}, {"_id": 0})
+        universities = {u['university_id']: u async for u in cursor}
+        return backend.top_k_payload(ranked, universities)
+
+    cache_key = cache.key(profile)
+    result = cache.get(cache_key)
+    if result is None:
+        if backend.PREDICT_MICROBATCH:
+            future = asyncio.wrap_future(backend.predict_batcher.submit_future(profile))
+            result = await asyncio.wait_for(future, timeout=30)
+        else:
+            university_ids, scores = await run_inference(backend.predict_profiles, [profile])
+            result = (university_ids[0], scores[0])
+        cache.put(cache_key, result)
+    return {'recommended_university_id': result[0]}
+
+
+# --- OpenAI Chat Route ---
+async def chat_with_openai(request):
+    data = await request.json()
+    prompt = data.get('prompt')
+    if not prompt:
+        return json_response({"error": "Prompt is required"}, 400)
+    messages = [{"role": "user", "content": prompt}]
+
+    if data.get('stream') or 'text/event-stream' in request.headers.get('accept', ''):
+        return StreamingResponse(
+            chat_event_stream(messages),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    try:
+        answer = await backend.llm.acomplete(messages, model="gpt-4-turbo", temperature=0.7, max_tokens=500)
+        return json_response({"response": answer}, 200)
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+async def chat_event_stream(messages):
+    """SSE body; a client disconnect cancels this generator, which closes the upstream stream."""
+    chunks = backend.llm.astream(messages, model="gpt-4-turbo", temperature=0.7, max_tokens=500)
+    try:
+        async for chunk in chunks:
+            yield f"data: {json.dumps({'delta': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    finally:
+        await chunks.aclose()
+
+
+# --- Latest University Info ---
+async def generate_university_summary(scraper, university):
+    """Async twin of app.generate_university_summary()."""
+    website = university.get('website')
+    text_content = ""
+
+    if website:
+        try:
+            text_content = await scraper.fetch_text(website, timeout=10)
+        except httpx.HTTPError:
+            text_content = ""
+
+    if not text_content:
+        try:
+            query = f"{university.get('name')} official website"
+            # googlesearch is blocking, so it runs on the default executor
+            search_results = await asyncio.to_thread(lambda: list(search(query, num_results=3)))
+            text_content = await scraper.gather_text(search_results, timeout=5, deadline=backend.SCRAPE_DEADLINE)
+        except Exception:
+            text_content = ""
+
+    answer = await backend.llm.acomplete(
+        [{"role": "user", "content": backend.build_summary_prompt(university, text_content)}],
+        model="gpt-4-turbo",
+        temperature=0.6,
+        max_tokens=500
+    )
+    return answer.strip()
+
+
+async def refresh_university_info(db, scraper, university):
+    answer = await generate_university_summary(scraper, university)
+    info = {
+        "university_id": university['university_id'],
+        "university_name": university.get('name'),
+        "updated_info": answer,
+        "fetched_at": datetime.now()
+    }
+    await db.university_info.update_one({"university_id": info['university_id']}, {"$set": info}, upsert=True)
+    return backend.info_payload(info)
+
+
+async def fresh_university_info(db, university_id):
+    info = await db.university_info.find_one({"university_id": university_id}, {"_id": 0})
+    if info and (datetime.now() - info['fetched_at']).total_seconds() < backend.UNIVERSITY_INFO_TTL:
+        return info
+    return None
+
+
+async def get_updated_university_info(request):
+    state = request.app.state
+    try:
+        data = await request.json()
+        university_id = data.get('university_id')
+        if not university_id:
+            return json_response({"error": "University ID is required"}, 400)
+
+        if not data.get('force'):
+            info = await fresh_university_info(state.db, university_id)
+            if info:
+                return json_response(backend.info_payload(info, cached=True), 200)
+
+        university = await state.db.universities.find_one({"university_id": university_id}, {"_id": 0})
+        if not university:
+            return json_response({"error": "University not found"}, 404)
+
+        job = state.info_jobs.submit(university_id, refresh_university_info, state.db, state.scraper, university)
+        return json_response({"job_id": job['job_id'], "status": job['status'], "university_id": university_id}, 202)
+
+    except Exception as e:
+        return json_response({"error": f"Unexpected server error: {str(e)}"}, 500)
+
+
+async def get_university_info_job(request):
+    state = request.app.state
+    job_id = request.path_params['job_id']
+    job = state.info_jobs.get(job_id)
+    if job is None:
+        # The job may have run in another worker process; fall back to the stored summary
+        university_id = request.query_params.get('university_id')
+        info = await fresh_university_info(state.db, university_id) if university_id else None
+        if info:
+            return json_response({"job_id": job_id, "status": "done", **backend.info_payload(info, cached=True)}, 200)
+        return json_response({"error": "Job not found"}, 404)
+    if job['status'] == 'done':
+        return json_response({"job_id": job_id, "status": "done", **job['result']}, 200)
+    if job['status'] == 'failed':
+        return json_response({"job_id": job_id, "status": "failed", "error": job['error']}, 500)
+    return json_response({"job_id": job_id, "status": job['status']}, 202)
+
+
+# --- Ratings ---
+async def get_average_rating(request):
+    university_id = request.path_params['university_id']
+    try:
+        summary = (await aread_rating_aggregates(request.app.state.db, [university_id]))[university_id]
+        return json_response({"average_rating": summary['average_rating'], "count": summary['count']}, 200)
+    except Exception as e:
+        return json_response({"error": f"Error calculating average rating: {str(e)}"}, 500)
+
+
+async def get_average_ratings(request):
+    if request.method == 'POST':
+        university_ids = (await request.json() or {}).get('university_ids')
+    else:
+        university_ids = [uid for uid in request.query_params.get('ids', '').split(',') if uid]
+    if not isinstance(university_ids, list) or not university_ids:
+        return json_response({"error": "university_ids is required"}, 400)
+    try:
+        return json_response(await aread_rating_aggregates(request.app.state.db, university_ids), 200)
+    except Exception as e:
+        return json_response({"error": f"Error calculating average ratings: {str(e)}"}, 500)
+
+
+def timed(route, endpoint):
+    """Record native routes in the Flask app's request histogram, under the Flask route name."""
+    if not backend.METRICS_ENABLED:
+        return endpoint
+
+    async def timed_endpoint(request):
+        start = time.perf_counter()
+        response = await endpoint(request)
+        backend.REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, route, response.status_code)
+        return response
+    return timed_endpoint
+
+
+routes = [
+    Route('/api/predict', timed('/api/predict', predict), methods=['POST']),
+    Route('/api/openai/chat', timed('/api/openai/chat', chat_with_openai), methods=['POST']),
+    Route('/api/university/update-info',
+          timed('/api/university/update-info', get_updated_university_info), methods=['POST']),
+    Route('/api/university/update-info/{job_id}',
+          timed('/api/university/update-info/<job_id>', get_university_info_job), methods=['GET']),
+    Route('/api/feedback/average-rating/{university_id}',
+          timed('/api/feedback/average-rating/<university_id>', get_average_rating), methods=['GET']),
+    Route('/api/feedback/average-ratings',
+          timed('/api/feedback/average-ratings', get_average_ratings), methods=['GET', 'POST']),
+    # Every other route is served by the Flask app on the bridge's thread pool
+    Mount('/', app=WSGIMiddleware(backend.app, workers=WSGI_THREADS)),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,126 @@
+# batching.py
+# Coalesces concurrent single-row predictions into one batched model call.
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+
+def _resolve(future, result=None, exception=None):
+    # Never let a Future in an unexpected state kill the worker thread and strand the rest of the queue
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many request threads for up to `window_ms`
+    (or until `max_batch` items are waiting), runs `predict_fn` once over the
+    whole batch and hands each caller its own result. Items whose caller
+    cancelled its Future (a timeout or a dropped client) are skipped.
+    """
+
+    def __init__(self, predict_fn, window_ms=2.0, max_batch=64):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        self._size_histogram = {}
+
+    def submit(self, item, timeout=None):
+        """Queue one item and block until its batch has been scored."""
+        return self.submit_future(item).result(timeout=timeout)
+
+    def submit_future(self, item):
+        """Queue one item and return its Future; async callers await it with asyncio.wrap_future()."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        # The worker thread does not survive a fork, so restart it per process. Only a forked
+        # child gets a new queue: the items in the parent's copy have no waiting caller there.
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive() or self._worker_pid != os.getpid():
+                if self._worker_pid is not None and self._worker_pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name="predict-microbatcher", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _take(self, batch, entry):
+        # A running Future can no longer be cancelled, so the result can always be set afterwards
+        if entry[1].set_running_or_notify_cancel():
+            batch.append(entry)
+
+    def _collect(self):
+        batch = []
+        while not batch:
+            self._take(batch, self._queue.get())
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                self._take(batch, self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.predict_fn(items)
+            except Exception:
+                # One malformed item must not fail its neighbours, so fall back to row-by-row
+                for item, future in batch:
+                    try:
+                        result = self.predict_fn([item])[0]
+                    except Exception as e:
+                        _resolve(future, exception=e)
+                    else:
+                        _resolve(future, result)
+            else:
+                for (_, future), result in zip(batch, results):
+                    _resolve(future, result)
+            self._record(len(batch))
+
+    def _record(self, size):
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        with self._lock:
+            self._batches += 1
+            self._rows += size
+            self._largest_batch = max(self._largest_batch, size)
+            self._size_histogram[bucket] = self._size_histogram.get(bucket, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "rows": self._rows,
+                "average_batch_size": self._rows / self._batches if self._batches else 0,
+                "largest_batch": self._largest_batch,
+                "batch_size_histogram": {f"<={size}": count for size, count in sorted(self._size_histogram.items())},
+                "window_ms": self.window * 1000.0,
+                "max_batch": self.max_batch,
+            }
+
@@ -0,0 +1,189 @@
+# concurrency.py
+# Load generator for comparing the Flask dev server with the ASGI serving mode.
+#
+# Start the server under test with the offline LLM backend so chat latency is
+# simulated rather than billed, e.g.
+#
+#   LLM_BACKEND=fake LLM_FAKE_DELAY_SECONDS=0.5 python app.py                   # :5000
+#   LLM_BACKEND=fake LLM_FAKE_DELAY_SECONDS=0.5 uvicorn asgi:app --port 8000 --workers 4
+#
+# then run the same scenario against both:
+#
+#   python benchmarks/concurrency.py --url http://127.0.0.1:5000 --scenario mixed -c 64 -n 2000
+#   python benchmarks/concurrency.py --url http://127.0.0.1:8000 --scenario mixed -c 64 -n 2000
+#
+# Each concurrent worker drives one HTTP/1.1 connection with a minimal
+# client, reconnecting whenever the server closes it (the Flask dev server
+# answers `Connection: close`). A full client library such as httpx costs
+# more CPU per request than the servers do, which on a shared core measures
+# the client rather than the server.
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sri_lanka_universities_with_degrees.csv')
+# Student profiles taken from the training data, without ids and labels
+PROFILES = (
+    pd.read_csv(DATA_PATH, nrows=2000)
+    .drop(columns=['student_id', 'university_id', 'university_name', 'location', 'recommended_university_id'])
+    .astype(object)
+    .to_dict('records')
+)
+
+
+def chat_request(i):
+    # Distinct prompts so the gateway cache does not hide upstream latency
+    return "POST", "/api/openai/chat", {"prompt": f"Summarize admission rules, request {i}"}
+
+
+def predict_request(i):
+    return "POST", "/api/predict", PROFILES[i % len(PROFILES)]
+
+
+def ratings_request(i):
+    return "GET", "/api/feedback/average-ratings?ids=P001,P002,P003", None
+
+
+def listing_request(i):
+    return "GET", "/api/universities?limit=50", None
+
+
+SCENARIOS = {
+    "chat": [chat_request],
+    "predict": [predict_request],
+    "ratings": [ratings_request],
+    "listing": [listing_request],
+    "mixed": [chat_request, predict_request, predict_request, ratings_request, listing_request],
+}
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection that answers (status, body) per request."""
+
+    def __init__(self, host, port, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body, default=str).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + payload)
+        try:
+            return await asyncio.wait_for(self._response(), self.timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _response(self):
+        status_line, *header_lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                body += await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            # No framing: the body runs until the server closes the connection
+            body = await self.reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return int(status_line.split()[1]), body
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q / 100 * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def run(url, scenario, concurrency, total, timeout):
+    makers = SCENARIOS[scenario]
+    counter = itertools.count()
+    latencies = []
+    # Per route, so a mixed run shows whether fast routes stay fast while LLM calls are in flight
+    route_latencies = {}
+    statuses = {}
+    errors = 0
+
+    target = urlsplit(url)
+
+    async def worker():
+        nonlocal errors
+        connection = Connection(target.hostname, target.port or 80, timeout)
+        while True:
+            i = next(counter)
+            if i >= total:
+                await connection.close()
+                return
+            method, path, body = makers[i % len(makers)](i)
+            start = time.perf_counter()
+            try:
+                status, _ = await connection.request(method, path, body)
+                statuses[status] = statuses.get(status, 0) + 1
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+                errors += 1
+                continue
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            route_latencies.setdefault(f"{method} {path.split('?')[0]}", []).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{url} scenario={scenario} concurrency={concurrency}")
+    print(f"  requests:   {len(latencies)} ok, {errors} transport errors, statuses {dict(sorted(statuses.items()))}")
+    print(f"  throughput: {len(latencies) / elapsed:.1f} req/s over {elapsed:.2f}s")
+    print("  latency:    p50 {:.1f} ms  p95 {:.1f} ms  p99 {:.1f} ms  max {:.1f} ms".format(
+        *(1000 * percentile(latencies, q) for q in (50, 95, 99, 100))
+    ))
+    if len(route_latencies) > 1:
+        for route, values in sorted(route_latencies.items()):
+            values.sort()
+            print("  {:<42} {:>5} ok  p50 {:.1f} ms  p95 {:.1f} ms  p99 {:.1f} ms".format(
+                route, len(values), *(1000 * percentile(values, q) for q in (50, 95, 99))
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent request capacity benchmark")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.scenario, args.concurrency, args.requests, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+# hot_paths.py
+# Reproducible benchmark of the backend's hot paths.
+#
+#   python benchmarks/hot_paths.py                                  # test client, mongomock
+#   python benchmarks/hot_paths.py --transport http -c 8            # real threaded HTTP server
+#   python benchmarks/hot_paths.py --mongo-uri mongodb://localhost:27017/university_bench
+#   python benchmarks/hot_paths.py --save benchmarks/baseline.json  # record a baseline
+#   python benchmarks/hot_paths.py --compare benchmarks/baseline.json
+#
+# The app runs with the offline LLM backend, an empty prediction cache and a
+# database seeded from sri_lanka_universities_with_degrees.csv. Each scenario
+# reports throughput, p50/p95/p99 latency and process memory.
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+DATA_PATH = os.path.join(BACKEND_DIR, 'sri_lanka_universities_with_degrees.csv')
+LABEL_COLUMNS = ['student_id', 'university_id', 'university_name', 'location', 'recommended_university_id']
+BENCH_PASSWORD = 'bench-password'
+
+
+# --- Environment ---
+def configure_environment(args):
+    """Point the app at the benchmark database, model and offline backends before it is imported."""
+    os.environ['MONGO_URI'] = args.mongo_uri or 'mongodb://localhost:27017/university_bench'
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['PREDICTION_CACHE_SIZE'] = str(args.prediction_cache)
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    if args.mongo_uri is None:
+        import flask_pymongo
+        import mongomock
+
+        def mongomock_client(*client_args, **kwargs):
+            kwargs.pop('driver', None)
+            kwargs.pop('connect', None)
+            return mongomock.MongoClient(*client_args, **kwargs)
+
+        flask_pymongo.MongoClient = mongomock_client
+
+    model_path = os.getenv('MODEL_PATH', os.path.join(BACKEND_DIR, 'university_recommendation_model.joblib'))
+    if not os.path.exists(model_path):
+        # No trained model checked out: build a small one so the predict paths have something to score
+        out_dir = os.path.join(tempfile.gettempdir(), 'university_bench_model')
+        model_path = os.path.join(out_dir, 'model.joblib')
+        compact_path = os.path.join(out_dir, 'model.compact')
+        if not os.path.exists(model_path):
+            os.makedirs(out_dir, exist_ok=True)
+            subprocess.run([sys.executable, os.path.join(BACKEND_DIR, 'train.py'), 'fit', DATA_PATH,
+                            '--trees', '100', '--test-size', '0', '--cache-dir', '',
+                            '--out', model_path, '--compact-out', compact_path], check=True)
+        os.environ['MODEL_PATH'] = model_path
+        os.environ['COMPACT_MODEL_PATH'] = compact_path
+
+
+def load_rows():
+    import pandas as pd
+    return pd.read_csv(DATA_PATH)
+
+
+def seed_database(db, df, users, ratings, password_hash, seed=42):
+    """Universities from the CSV plus synthetic users and ratings. Clears the benchmark collections first."""
+    for name in ('universities', 'users', 'feedback', 'rating_aggregates', 'booking'):
+        db[name].delete_many({})
+
+    universities = []
+    for university_id, group in df.groupby('university_id'):
+        first = group.iloc[0]
+        universities.append({
+            "university_id": university_id,
+            "name": first['university_name'],
+            "location": first['location'],
+            "university_type": first['university_type'],
+            "degree_programs": sorted(group['degree_programs'].unique().tolist()),
+            "semester_fee_lkr": int(first['semester_fee_lkr']),
+            "hostel_available": bool(first['hostel_available']),
+            "ranking": int(first['ranking_score']),
+            "website": f"https://{university_id.lower()}.example.lk",
+        })
+    db.universities.insert_many(universities)
+
+    db.users.insert_many([
+        {"username": f"student{i}", "password": password_hash, "user_type": "user",
+         "full_name": f"Student {i}", "email": f"student{i}@example.com", "age": 19, "city": "Colombo"}
+        for i in range(users)
+    ])
+
+    rng = random.Random(seed)
+    ids = [u['university_id'] for u in universities]
+    feedback = {}
+    for _ in range(ratings):
+        key = (f"student{rng.randrange(users)}@example.com", rng.choice(ids))
+        feedback[key] = rng.randint(1, 5)
+    if feedback:
+        db.feedback.insert_many([
+            {"user_email": email, "university_id": uid, "rating": rating, "timestamp": datetime.now()}
+            for (email, uid), rating in feedback.items()
+        ])
+    return universities
+
+
+# --- Transports ---
+class TestClientTransport:
+    """Calls the WSGI app in-process through Flask's test client."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        res = client.open(path, method=method, json=body, headers=headers)
+        return res.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    """Serves the app from a threaded werkzeug server on a free port and calls it over real sockets."""
+
+    def __init__(self, app, pool_size=16):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+
+    def send(self, method, path, body=None, headers=None):
+        res = self.session.request(method, self.base_url + path, json=body, headers=headers)
+        return res.status_code
+
+    def close(self):
+        self.server.shutdown()
+        self.session.close()
+
+
+# --- Scenarios ---
+class Workload:
+    """Request factories for every scenario, drawing from the seeded data."""
+
+    def __init__(self, df, universities, users, batch_size, seed=7):
+        self.rng = random.Random(seed)
+        self.profiles = (
+            df.drop(columns=LABEL_COLUMNS).astype(object).to_dict('records')
+        )
+        self.university_ids = [u['university_id'] for u in universities]
+        words = sorted({w for u in universities for w in u['name'].split() if len(w) > 3})
+        self.search_terms = words + [u['location'] for u in universities]
+        self.users = users
+        self.batch_size = batch_size
+
+    def profile(self, i):
+        return self.profiles[i % len(self.profiles)]
+
+    def predict_single(self, i):
+        return 'POST', '/api/predict', self.profile(i)
+
+    def predict_top_k(self, i):
+        return 'POST', '/api/predict?top_k=5', self.profile(i)
+
+    def predict_batch(self, i):
+        start = (i * self.batch_size) % len(self.profiles)
+        return 'POST', '/api/predict/batch', self.profiles[start:start + self.batch_size]
+
+    def universities_listing(self, i):
+        return 'GET', '/api/universities', None
+
+    def universities_page(self, i):
+        return 'GET', '/api/universities?limit=20', None
+
+    def universities_search(self, i):
+        return 'GET', f"/api/universities/search?q={self.search_terms[i % len(self.search_terms)]}", None
+
+    def submit_rating(self, i):
+        body = {
+            "user_email": f"student{self.rng.randrange(self.users)}@example.com",
+            "university_id": self.rng.choice(self.university_ids),
+            "rating": self.rng.randint(1, 5),
+        }
+        return 'POST', '/api/feedback/submit-rating', body
+
+    def average_rating(self, i):
+        return 'GET', f"/api/feedback/average-rating/{self.university_ids[i % len(self.university_ids)]}", None
+
+    def login(self, i):
+        return 'POST', '/login', {"username": f"student{i % self.users}", "password": BENCH_PASSWORD}
+
+
+# name -> default request count; login is bcrypt-bound, so it gets fewer
+SCENARIOS = {
+    "predict_single": 500,
+    "predict_top_k": 500,
+    "predict_batch": 50,
+    "universities_listing": 500,
+    "universities_page": 1000,
+    "universities_search": 1000,
+    "submit_rating": 1000,
+    "average_rating": 1000,
+    "login": 40,
+}
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q / 100 * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def run_scenario(transport, make_request, requests_count, concurrency, warmup, trace_memory):
+    for i in range(warmup):
+        transport.send(*make_request(i))
+
+    latencies = [0.0] * requests_count
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(i):
+        method, path, body = make_request(warmup + i)
+        start = time.perf_counter()
+        status = transport.send(method, path, body)
+        latencies[i] = time.perf_counter() - start
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+
+    rss_before = rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests_count)))
+    else:
+        for i in range(requests_count):
+            one(i)
+    elapsed = time.perf_counter() - start
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    latencies.sort()
+    result = {
+        "requests": requests_count,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": round(requests_count / elapsed, 1),
+        "p50_ms": round(1000 * percentile(latencies, 50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 99), 3),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+    }
+    if traced_peak is not None:
+        result["traced_peak_mb"] = round(traced_peak, 1)
+    return result
+
+
+# --- Baselines ---
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print per-scenario changes against a baseline; returns the scenarios that regressed."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        throughput = current["throughput_rps"] / previous["throughput_rps"] - 1
+        p95 = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        # Sub-millisecond latencies jitter by more than the tolerance, so p95 also needs an absolute change
+        regressed = throughput < -tolerance or (p95 > tolerance and current["p95_ms"] - previous["p95_ms"] > 0.5)
+        if regressed:
+            regressions.append(name)
+        print(f"{'❌' if regressed else '✅'} {name:22} throughput {throughput:+7.1%}   p95 {p95:+7.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend hot paths")
+    parser.add_argument("--transport", choices=["test-client", "http"], default="test-client")
+    parser.add_argument("--mongo-uri", default=None, help="real MongoDB to use instead of mongomock (it is reseeded)")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="run a subset of scenarios")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's request count")
+    parser.add_argument("-c", "--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=100, help="profiles per /api/predict/batch call")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--ratings", type=int, default=5000)
+    parser.add_argument("--prediction-cache", type=int, default=0, help="PREDICTION_CACHE_SIZE (0 = cold model)")
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peaks (slower)")
+    parser.add_argument("--save", default=None, help="write results JSON here (e.g. a baseline)")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed throughput/p95 change")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+
+    df = load_rows()
+    password_hash = backend.hasher.hash(BENCH_PASSWORD)
+    universities = seed_database(backend.mongo.db, df, args.users, args.ratings, password_hash)
+    backend.rebuild_rating_aggregates(backend.mongo.db)
+    backend.catalogue.refresh()
+    workload = Workload(df, universities, args.users, args.batch_size)
+
+    transport = HTTPTransport(backend.app, pool_size=max(args.concurrency, 4)) if args.transport == 'http' \
+        else TestClientTransport(backend.app)
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "transport": args.transport,
+        "mongo": "mongod" if args.mongo_uri else "mongomock",
+        "concurrency": args.concurrency,
+        "inference_backend": backend.INFERENCE_BACKEND,
+        "scenarios": {},
+    }
+    try:
+        print(f"{'scenario':22} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+        for name in args.only or SCENARIOS:
+            count = max(int(SCENARIOS[name] * args.scale), 1)
+            result = run_scenario(transport, getattr(workload, name), count, args.concurrency,
+                                  args.warmup, args.trace_memory)
+            if name == 'predict_batch':
+                result["rows_per_second"] = round(result["throughput_rps"] * args.batch_size, 1)
+            results["scenarios"][name] = result
+            print(f"{name:22} {result['throughput_rps']:9.1f} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+                  f"{result['p99_ms']:9.2f} {result['rss_mb']:8.1f}  {result['statuses']}")
+    finally:
+        transport.close()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare} (commit {baseline.get('commit')}, tolerance {args.tolerance:.0%})")
+        sys.exit(1 if compare(results, baseline, args.tolerance) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# catalogue.py
+# In-process copy of the universities collection with an n-gram inverted index
+# for search-as-you-type.
+import bisect
+import hashlib
+import json
+import threading
+import time
+
+from pymongo import ReturnDocument
+
+SEARCH_FIELDS = {"name": 3.0, "location": 1.0, "degree_programs": 1.0}
+MAX_GRAM = 3
+# Document in the catalogue_state collection whose counter moves on every catalogue write
+STATE_ID = "universities"
+
+
+def normalize_text(value):
+    return " ".join(str(value).lower().split())
+
+
+def field_texts(doc, field):
+    """Searchable strings of one field; degree_programs may hold strings or {"name": ...} dicts."""
+    value = doc.get(field)
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        texts = [item.get("name") if isinstance(item, dict) else item for item in value]
+        return [normalize_text(text) for text in texts if text]
+    return [normalize_text(value)]
+
+
+def read_stored_version(collection):
+    doc = collection.find_one({"_id": STATE_ID}, {"version": 1})
+    return doc["version"] if doc else 0
+
+
+def bump_stored_version(collection):
+    """Record a catalogue write so every worker reloads; returns the new version."""
+    doc = collection.find_one_and_update(
+        {"_id": STATE_ID}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+def grams(text):
+    """All 1..MAX_GRAM character grams, so any substring of a query can be looked up."""
+    found = set()
+    for n in range(1, MAX_GRAM + 1):
+        for i in range(len(text) - n + 1):
+            found.add(text[i:i + n])
+    return found
+
+
+class CatalogueIndex:
+    """
+    Holds every university document in memory and answers substring searches
+    over name, location and degree programs from an inverted n-gram index.
+    The admin routes keep it current through upsert()/remove(), which also
+    bump a version stored in MongoDB. Every worker compares that version at
+    most once per `check_seconds` and reloads when it moved, so all workers
+    converge on the same catalogue (and ETag) within about that interval.
+    A full reload every `refresh_seconds` is the backstop for direct writes.
+    """
+
+    def __init__(self, loader, refresh_seconds=300, version_reader=None, version_bumper=None, check_seconds=1.0):
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.version_reader = version_reader
+        self.version_bumper = version_bumper
+        self.check_seconds = check_seconds
+        self._lock = threading.RLock()
+        # Serializes reloads and version checks, so a stale catalogue is reloaded once, not by every request
+        self._refresh_lock = threading.RLock()
+        self._docs = {}
+        self._texts = {}
+        self._postings = {}
+        self._loaded_at = None
+        self._next_check = 0.0
+        self._stored_version = None
+        self._snapshot = None
+        self.version = 0
+
+    def refresh(self):
+        with self._refresh_lock:
+            # Read the stored version first: a write landing during the load moves it again
+            stored_version = self.version_reader() if self.version_reader else None
+            docs = list(self.loader())
+            with self._lock:
+                self._docs = {}
+                self._texts = {}
+                self._postings = {}
+                for doc in docs:
+                    self._add(doc)
+                self._loaded_at = time.monotonic()
+                self._stored_version = stored_version
+                self._bump()
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now < self._next_check:
+            return
+        # Until the first load everybody waits for it; afterwards one thread checks while the rest serve the current copy
+        if not self._refresh_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self._loaded_at is None or now - self._loaded_at > self.refresh_seconds:
+                self.refresh()
+            elif self.version_reader and self.version_reader() != self._stored_version:
+                self.refresh()
+            self._next_check = time.monotonic() + self.check_seconds
+        finally:
+            self._refresh_lock.release()
+
+    def _publish(self):
+        if self.version_bumper is None:
+            return
+        expected = self._stored_version
+        stored_version = self.version_bumper()
+        with self._lock:
+            # Only adopt the new version if no other worker wrote in between; otherwise the next check reloads
+            if expected is not None and stored_version == expected + 1 and self._stored_version == expected:
+                self._stored_version = stored_version
+
+    def _bump(self):
+        # Any change to the catalogue invalidates the serialized snapshot
+        self.version += 1
+        self._snapshot = None
+
+    def _add(self, doc):
+        university_id = doc.get("university_id")
+        if university_id is None:
+            return
+        texts = {field: field_texts(doc, field) for field in SEARCH_FIELDS}
+        self._docs[university_id] = doc
+        self._texts[university_id] = texts
+        for gram in set().union(*(grams(text) for values in texts.values() for text in values)):
+            self._postings.setdefault(gram, set()).add(university_id)
+
+    def _discard(self, university_id):
+        texts = self._texts.pop(university_id, None)
+        self._docs.pop(university_id, None)
+        if texts is None:
+            return
+        for gram in set().union(*(grams(text) for values in texts.values() for text in values)):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(university_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def upsert(self, doc):
+        doc = {k: v for k, v in doc.items() if k != "_id"}
+        with self._lock:
+            self._discard(doc.get("university_id"))
+            self._add(doc)
+            self._bump()
+        self._publish()
+
+    def remove(self, university_id):
+        with self._lock:
+            self._discard(university_id)
+            self._bump()
+        self._publish()
+
+    def get(self, university_id):
+        self.ensure_fresh()
+        return self._docs.get(university_id)
+
+    def all(self):
+        self.ensure_fresh()
+        with self._lock:
+            return list(self._docs.values())
+
+    def snapshot(self):
+        """
+        The whole catalogue ordered by university_id, serialized once per
+        version. Returns (etag, body, ids, docs); the ETag is a content hash so
+        it agrees across worker processes.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            if self._snapshot is None:
+                ids = sorted(self._docs, key=str)
+                docs = [self._docs[uid] for uid in ids]
+                body = json.dumps(docs, default=str, separators=(",", ":")).encode("utf-8")
+                etag = hashlib.sha1(body).hexdigest()
+                self._snapshot = (etag, body, [str(uid) for uid in ids], docs)
+            return self._snapshot
+
+    def page(self, cursor=None, limit=50):
+        """Keyset page of documents after `cursor` (a university_id); returns (docs, next_cursor)."""
+        _, _, ids, docs = self.snapshot()
+        start = bisect.bisect_right(ids, str(cursor)) if cursor else 0
+        page = docs[start:start + limit]
+        next_cursor = ids[start + limit - 1] if start + limit < len(ids) else None
+        return page, next_cursor
+
+    def _candidates(self, term):
+        # Every gram of the term must appear in the document; substring checks confirm the match
+        pieces = [term[i:i + MAX_GRAM] for i in range(max(len(term) - MAX_GRAM + 1, 1))]
+        candidates = None
+        for piece in pieces:
+            posting = self._postings.get(piece, set())
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return set()
+        return candidates
+
+    def _score(self, university_id, term):
+        score = 0.0
+        for field, weight in SEARCH_FIELDS.items():
+            best = 0.0
+            for text in self._texts[university_id][field]:
+                if text == term:
+                    best = max(best, 4.0)
+                elif text.startswith(term):
+                    best = max(best, 3.0)
+                elif f" {term}" in f" {text}":
+                    best = max(best, 2.0)
+                elif term in text:
+                    best = max(best, 1.0)
+            score += weight * best
+        return score
+
+    def _matches(self, term):
+        return {uid for uid in self._candidates(term) if self._score(uid, term) > 0}
+
+    def search(self, query, offset=0, limit=None):
+        """Ranked substring search; returns (total_matches, page_of_documents). limit=None returns every match."""
+        query = normalize_text(query)
+        if not query:
+            return 0, []
+        self.ensure_fresh()
+        with self._lock:
+            # The whole query is matched as a phrase first; otherwise every word must match
+            terms = [query]
+            matches = self._matches(query)
+            if not matches and " " in query:
+                terms = query.split()
+                matches = None
+                for term in terms:
+                    term_matches = self._matches(term)
+                    matches = term_matches if matches is None else matches & term_matches
+                    if not matches:
+                        break
+            if not matches:
+                return 0, []
+            ranked = sorted(
+                matches,
+                key=lambda uid: (-sum(self._score(uid, term) for term in terms), self._texts[uid]["name"], uid)
+            )
+            page = [self._docs[uid] for uid in ranked[offset:None if limit is None else offset + limit]]
+            return len(ranked), page
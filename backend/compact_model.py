@@ -0,0 +1,308 @@
+# compact_model.py
+# Flat, array-backed export of the trained recommendation pipeline.
+#
+# Layout of a compact model directory:
+#   meta.json      - classes, feature layout, one-hot vocabularies and a
+#                    content hash of the export
+#   feature.npy    - split feature per node (int32, -2 for leaves)
+#   threshold.npy  - split threshold per node (float64)
+#   left.npy       - absolute index of the left child (int32, -1 for leaves)
+#   right.npy      - absolute index of the right child (int32, -1 for leaves)
+#   leaf.npy       - row in values.npy for leaf nodes (int32, -1 for splits)
+#   values.npy     - class probabilities per leaf (float64, n_leaves x n_classes)
+#   roots.npy      - index of each tree's root node (int32)
+# Nodes of all trees are concatenated, so the files can be memory-mapped and
+# shared between worker processes instead of unpickling a copy per worker.
+# The model path is a symlink to a versioned sibling directory; an export
+# writes a new version and swaps the link, never touching mapped files.
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'leaf', 'values', 'roots']
+
+
+def _feature_layout(preprocessor):
+    """Describe how the ColumnTransformer lays raw columns out in the encoded matrix."""
+    input_columns = list(preprocessor.feature_names_in_)
+    blocks = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == 'drop':
+            continue
+        columns = [input_columns[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+        if len(columns) == 0:
+            continue
+        # Recent scikit-learn versions store passthrough columns as an identity FunctionTransformer
+        is_identity = type(transformer).__name__ == 'FunctionTransformer' and transformer.func is None
+        if transformer == 'passthrough' or is_identity:
+            blocks.append({"kind": "passthrough", "columns": columns})
+        elif type(transformer).__name__ == 'OneHotEncoder':
+            if transformer.drop is not None:
+                raise ValueError("OneHotEncoder with drop= is not supported by the compact format")
+            blocks.append({
+                "kind": "onehot",
+                "columns": columns,
+                "categories": [[c.item() if hasattr(c, 'item') else c for c in cats] for cats in transformer.categories_]
+            })
+        else:
+            raise ValueError(f"Unsupported transformer in compact export: {name}")
+    return input_columns, blocks
+
+
+def content_hash(meta, arrays):
+    """SHA-256 over the metadata and every array, computed once at export so loaders never re-read the files."""
+    digest = hashlib.sha256(json.dumps(meta, sort_keys=True).encode('utf-8'))
+    for name in ARRAY_NAMES:
+        digest.update(name.encode('utf-8'))
+        digest.update(np.ascontiguousarray(arrays[name]))
+    return digest.hexdigest()
+
+
+def _version_stamp(timestamp):
+    # Microseconds, so versions sort by age and repeated exports never collide
+    return time.strftime('%Y%m%d%H%M%S', time.localtime(timestamp)) + f"{int(timestamp * 1e6) % 1000000:06d}"
+
+
+def export_compact_model(pipeline, out_dir):
+    """Write a fitted preprocessor + RandomForestClassifier pipeline as a compact model directory."""
+    preprocessor = pipeline.named_steps['preprocessor']
+    forest = pipeline.named_steps['classifier']
+    input_columns, blocks = _feature_layout(preprocessor)
+
+    features, thresholds, lefts, rights, leaves, values, roots = [], [], [], [], [], [], []
+    node_offset = 0
+    leaf_offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        leaf_rows = np.full(tree.node_count, -1, dtype=np.int32)
+        leaf_rows[is_leaf] = np.arange(is_leaf.sum(), dtype=np.int32) + leaf_offset
+        leaf_values = tree.value[is_leaf, 0, :]
+        leaf_values = leaf_values / leaf_values.sum(axis=1, keepdims=True)
+
+        roots.append(node_offset)
+        features.append(np.where(is_leaf, -2, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, -1, tree.children_left + node_offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, tree.children_right + node_offset).astype(np.int32))
+        leaves.append(leaf_rows)
+        values.append(leaf_values)
+        node_offset += tree.node_count
+        leaf_offset += int(is_leaf.sum())
+
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'leaf': np.concatenate(leaves),
+        'values': np.concatenate(values).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "classes": [c.item() if hasattr(c, 'item') else c for c in forest.classes_],
+        "input_columns": input_columns,
+        "blocks": blocks,
+        "n_features": int(forest.n_features_in_),
+        "n_trees": len(forest.estimators_),
+        "max_depth": int(max(e.tree_.max_depth for e in forest.estimators_)),
+    }
+    meta["content_hash"] = content_hash(meta, arrays)
+
+    # Never rewrite files in place: running workers have them memory-mapped
+    version_dir = f"{out_dir.rstrip(os.sep)}.{_version_stamp(time.time())}-{os.getpid()}"
+    os.makedirs(version_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(version_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(version_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    publish_version(out_dir, version_dir)
+    return meta
+
+
+def publish_version(out_dir, version_dir, keep=2):
+    """
+    Point the `out_dir` symlink at `version_dir` with one atomic rename, so a
+    loader sees either the old model or the new one, never a mix. The newest
+    `keep` versions are kept; older ones are removed (workers that still map
+    them keep their pages until they reload).
+    """
+    out_dir = out_dir.rstrip(os.sep)
+    if os.path.isdir(out_dir) and not os.path.islink(out_dir):
+        # A plain directory from an older export becomes the previous version
+        os.rename(out_dir, f"{out_dir}.{_version_stamp(os.path.getmtime(out_dir))}-0")
+    link = f"{out_dir}.link-{os.getpid()}"
+    os.symlink(os.path.basename(version_dir), link)
+    os.replace(link, out_dir)
+
+    prefix = os.path.basename(out_dir) + "."
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    versions = sorted(
+        name for name in os.listdir(parent)
+        if name.startswith(prefix) and name != os.path.basename(version_dir)
+        and os.path.isfile(os.path.join(parent, name, 'meta.json'))
+    )
+    for name in versions[:max(len(versions) - (keep - 1), 0)]:
+        shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+
+class CompactModel:
+    """A compact model directory loaded into (optionally memory-mapped) NumPy arrays."""
+
+    def __init__(self, meta, arrays, load_seconds=0.0, fingerprint=None):
+        self.meta = meta
+        self.fingerprint = fingerprint or meta.get('content_hash')
+        self.classes_ = np.asarray(meta['classes'], dtype=object)
+        self.feature_names_in_ = np.asarray(meta['input_columns'], dtype=object)
+        self.load_seconds = load_seconds
+        for name in ARRAY_NAMES:
+            # Plain ndarray views of the mapped pages: indexing an np.memmap goes through
+            # Python-level __getitem__/__array_finalize__ on every fancy-index in the tree walk
+            setattr(self, name, np.asarray(arrays[name]))
+        self._build_encoders()
+
+    def _build_encoders(self):
+        # Each categorical value maps straight to its one-hot column, so encoding is a dict lookup
+        self.onehot_lookups = []
+        self.passthrough_positions = []
+        position = 0
+        for block in self.meta['blocks']:
+            if block['kind'] == 'onehot':
+                for column, categories in zip(block['columns'], block['categories']):
+                    lookup = {category: position + i for i, category in enumerate(categories)}
+                    self.onehot_lookups.append((column, lookup))
+                    position += len(categories)
+            else:
+                for column in block['columns']:
+                    self.passthrough_positions.append((column, position))
+                    position += 1
+        if position != self.meta['n_features']:
+            raise ValueError(f"Compact model layout has {position} features, expected {self.meta['n_features']}")
+
+    def encode(self, profiles):
+        """
+        Encode a list of profile dicts into the float32 matrix the trees were
+        trained on. Missing or null features raise ValueError, as the sklearn
+        pipeline does, rather than being routed down the trees as NaN/zeros.
+        """
+        X = np.zeros((len(profiles), self.meta['n_features']), dtype=np.float32)
+        for i, profile in enumerate(profiles):
+            for column, lookup in self.onehot_lookups:
+                value = profile.get(column)
+                if value is None:
+                    raise ValueError(f"Missing value for feature '{column}'")
+                # Unknown categories leave the block all zeros, like handle_unknown='ignore'
+                position = lookup.get(value)
+                if position is not None:
+                    X[i, position] = 1.0
+            for column, position in self.passthrough_positions:
+                value = profile.get(column)
+                if value is None:
+                    raise ValueError(f"Missing value for feature '{column}'")
+                value = float(value)
+                if value != value:
+                    raise ValueError(f"Input contains NaN for feature '{column}'")
+                X[i, position] = value
+        return X
+
+    def predict_proba(self, profiles):
+        """Average leaf probabilities over all trees, walking every (row, tree) pair in lockstep."""
+        X = profiles if isinstance(profiles, np.ndarray) else self.encode(profiles)
+        n_rows = X.shape[0]
+        # One slot per (row, tree); only slots still sitting on a split node are advanced
+        nodes = np.tile(np.asarray(self.roots), n_rows)
+        rows = np.repeat(np.arange(n_rows), self.n_trees)
+        active = np.arange(nodes.shape[0])
+        while active.size:
+            current = nodes[active]
+            features = self.feature[current]
+            split = features >= 0
+            active, current, features = active[split], current[split], features[split]
+            if not active.size:
+                break
+            # Comparing float32 inputs with float64 thresholds mirrors scikit-learn's tree traversal
+            go_left = X[rows[active], features] <= self.threshold[current]
+            nodes[active] = np.where(go_left, self.left[current], self.right[current])
+
+        leaf_rows = self.leaf[nodes].reshape(n_rows, self.n_trees)
+        probabilities = np.zeros((n_rows, len(self.classes_)), dtype=np.float64)
+        for tree in range(self.n_trees):
+            probabilities += self.values[leaf_rows[:, tree]]
+        probabilities /= self.n_trees
+        return probabilities
+
+    def predict(self, profiles):
+        return self.classes_[self.predict_proba(profiles).argmax(axis=1)]
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def describe(self):
+        return {
+            "trees": self.n_trees,
+            "nodes": int(self.feature.shape[0]),
+            "classes": len(self.classes_),
+            "features": self.meta['n_features'],
+            "load_ms": round(self.load_seconds * 1000, 2),
+        }
+
+
+def load_compact_model(path, mmap=True):
+    """Open a compact model directory; with mmap=True the arrays are paged in lazily and shared."""
+    start = time.perf_counter()
+    # Resolve the symlink once so every file comes from the same exported version
+    path = os.path.realpath(path)
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format: {meta.get('format_version')}")
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+        for name in ARRAY_NAMES
+    }
+    # Exports from before content hashes: a version directory is never rewritten, so its path and age identify it
+    fingerprint = meta.get('content_hash') or f"{path}@{os.stat(os.path.join(path, 'meta.json')).st_mtime_ns}"
+    return CompactModel(meta, arrays, load_seconds=time.perf_counter() - start, fingerprint=fingerprint)
+
+
+def verify_parity(pipeline, compact, csv_path):
+    """Compare compact-engine predictions with the joblib pipeline on every row of a training CSV."""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    X = df[list(compact.feature_names_in_)]
+    for col in X.select_dtypes(include='bool').columns:
+        X[col] = X[col].astype(int)
+    expected = pipeline.predict(X)
+    actual = compact.predict(X.to_dict('records'))
+    mismatches = int((expected != actual).sum())
+    max_proba_error = float(np.abs(pipeline.predict_proba(X) - compact.predict_proba(X.to_dict('records'))).max())
+    return {"rows": len(X), "mismatches": mismatches, "max_proba_error": max_proba_error}
+
+
+if __name__ == '__main__':
+    # python compact_model.py export <model.joblib> <out_dir>
+    # python compact_model.py verify <model.joblib> <compact_dir> <data.csv>
+    import joblib
+
+    if len(sys.argv) == 4 and sys.argv[1] == 'export':
+        meta = export_compact_model(joblib.load(sys.argv[2]), sys.argv[3])
+        print(f"✅ Exported {meta['n_trees']} trees and {len(meta['classes'])} classes to {sys.argv[3]}")
+    elif len(sys.argv) == 5 and sys.argv[1] == 'verify':
+        report = verify_parity(joblib.load(sys.argv[2]), load_compact_model(sys.argv[3]), sys.argv[4])
+        status = "✅" if report['mismatches'] == 0 else "❌"
+        print(f"{status} {report['mismatches']} mismatches in {report['rows']} rows "
+              f"(max probability error {report['max_proba_error']:.2e})")
+        sys.exit(0 if report['mismatches'] == 0 else 1)
+    else:
+        print("Usage: python compact_model.py export <model.joblib> <out_dir>")
+        print("       python compact_model.py verify <model.joblib> <compact_dir> <data.csv>")
+        sys.exit(1)
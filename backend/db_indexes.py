@@ -0,0 +1,203 @@
+# db_indexes.py
+# Declared MongoDB indexes and a query-plan audit of every route's query shape.
+#
+#   python db_indexes.py ensure     # create missing indexes
+#   python db_indexes.py audit      # explain() each query shape, flag COLLSCAN and SORT stages
+#
+# Both read MONGO_URI from the environment / .env like app.py.
+import argparse
+import os
+import sys
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from exports import export_sort
+
+# Collection -> indexes the routes rely on. Unnamed indexes keep MongoDB's
+# default names so databases that already have them are left untouched.
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+    ],
+    "universities": [
+        IndexModel([("university_id", ASCENDING)], unique=True, name="university_id_unique"),
+    ],
+    "university_info": [
+        IndexModel([("university_id", ASCENDING)], unique=True, name="university_id_unique"),
+    ],
+    "rating_aggregates": [
+        IndexModel([("university_id", ASCENDING)], unique=True, name="university_id_unique"),
+    ],
+    "feedback": [
+        # One rating per user and university; lets submit_rating upsert in a single round trip
+        IndexModel([("user_email", ASCENDING), ("university_id", ASCENDING)], unique=True,
+                   name="user_email_university_id_unique"),
+        # Exports filter on university_id and/or a date range and page in (date, _id) order
+        IndexModel([("university_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("timestamp", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "booking": [
+        IndexModel([("university_id", ASCENDING), ("booking_date", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("booking_date", ASCENDING), ("_id", ASCENDING)]),
+    ],
+}
+
+FEEDBACK_EXPORT_SORT = export_sort("timestamp")
+BOOKING_EXPORT_SORT = export_sort("booking_date")
+
+# (route, collection, filter, sort) for every query the API issues, with the sort it really uses.
+# full_scan marks reads that intentionally visit the whole collection.
+QUERY_SHAPES = [
+    {"route": "POST /signup, POST /login", "collection": "users", "filter": {"username": "admin"}},
+    {"route": "GET|PUT|DELETE /api/user/*", "collection": "users", "filter": {"username": "admin"}},
+    {"route": "POST /api/predict (top_k)", "collection": "universities",
+     "filter": {"university_id": {"$in": ["P001", "P002"]}}},
+    {"route": "/api/admin/universities/<id>, import", "collection": "universities", "filter": {"university_id": "P001"}},
+    {"route": "POST /api/university/update-info", "collection": "university_info", "filter": {"university_id": "P001"}},
+    {"route": "POST /api/feedback/submit-rating", "collection": "feedback",
+     "filter": {"user_email": "user@example.com", "university_id": "P001"}},
+    {"route": "POST /api/admin/feedback/import (rebuild)", "collection": "feedback",
+     "filter": {"university_id": {"$in": ["P001", "P002"]}}},
+    {"route": "GET /api/feedback/average-rating(s)", "collection": "rating_aggregates",
+     "filter": {"university_id": {"$in": ["P001", "P002"]}}},
+    {"route": "GET /api/admin/feedback?university_id", "collection": "feedback",
+     "filter": {"university_id": "P001"}, "sort": FEEDBACK_EXPORT_SORT},
+    {"route": "GET /api/admin/feedback?from&to", "collection": "feedback",
+     "filter": {"timestamp": {"$gte": "2024-01-01", "$lt": "2025-01-01"}}, "sort": FEEDBACK_EXPORT_SORT},
+    {"route": "GET /api/admin/feedback (all rows)", "collection": "feedback", "filter": {}, "sort": FEEDBACK_EXPORT_SORT},
+    {"route": "GET /api/admin/bookings?university_id", "collection": "booking",
+     "filter": {"university_id": "P001"}, "sort": BOOKING_EXPORT_SORT},
+    {"route": "GET /api/admin/bookings?from&to", "collection": "booking",
+     "filter": {"booking_date": {"$gte": "2024-01-01", "$lt": "2025-01-01"}}, "sort": BOOKING_EXPORT_SORT},
+    {"route": "GET /api/admin/bookings?university_id&after", "collection": "booking",
+     "filter": {"university_id": "P001", "$and": [
+         {"booking_date": {"$gte": "2024-06-01"}},
+         {"$or": [{"booking_date": {"$gt": "2024-06-01"}}, {"_id": {"$gt": ObjectId("000000000000000000000000")}}]},
+     ]}, "sort": BOOKING_EXPORT_SORT},
+    {"route": "GET /api/admin/bookings (all rows)", "collection": "booking", "filter": {}, "sort": BOOKING_EXPORT_SORT},
+    {"route": "catalogue snapshot", "collection": "universities", "filter": {}, "full_scan": True},
+]
+
+
+def ensure_indexes(db, indexes=None):
+    """
+    Create every declared index that is missing. A failure on one index (for
+    example duplicates blocking a unique index) is reported and the rest are
+    still created. Returns {collection: [created or failed index names]}.
+    """
+    report = {}
+    for collection, models in (indexes or INDEXES).items():
+        names = []
+        for model in models:
+            try:
+                names.append(db[collection].create_indexes([model])[0])
+            except OperationFailure as e:
+                names.append(f"FAILED {model.document.get('name', model.document['key'])}: {e}")
+        report[collection] = names
+    return report
+
+
+def plan_stages(plan):
+    """All stage names in an explain() plan tree, top-down."""
+    stages = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.append(node["stage"])
+        # Slot-based engine plans nest the classic tree under queryPlan
+        for key in ("queryPlan", "inputStage"):
+            if key in node:
+                stack.append(node[key])
+        stack.extend(node.get("inputStages", []))
+    return stages
+
+
+def indexed_prefix(db, collection, keys):
+    """Fallback for drivers without explain() (mongomock): does an index start with a filter or sort key?"""
+    for info in db[collection].index_information().values():
+        if next(iter(dict(info["key"]))) in keys:
+            return True
+    return False
+
+
+def index_serves_sort(db, collection, filter, sort):
+    """
+    Fallback for drivers without explain(): is there an index made of every
+    equality-filter key followed by the sort keys? An index that only
+    matches the sort (such as _id) would walk the whole collection.
+    """
+    equality = {key for key, value in filter.items()
+                if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))}
+    wanted = [key for key, _ in sort]
+    for info in db[collection].index_information().values():
+        keys = list(dict(info["key"]))
+        prefix = set(keys[:len(equality)])
+        if prefix == equality and keys[len(equality):len(equality) + len(wanted)] == wanted:
+            return True
+    return False
+
+
+def audit_queries(db, shapes=None):
+    """
+    explain() every query shape and return one row per shape with the
+    winning plan's stages, a `collscan` flag for unexpected full scans and
+    a `blocking_sort` flag for in-memory SORT stages.
+    """
+    rows = []
+    for shape in shapes or QUERY_SHAPES:
+        cursor = db[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        try:
+            explained = cursor.explain()
+            stages = plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+        except (AttributeError, NotImplementedError):
+            keys = list(shape["filter"]) + [key for key, _ in shape.get("sort", [])]
+            stages = ["IXSCAN"] if indexed_prefix(db, shape["collection"], keys) else ["COLLSCAN"]
+            if shape.get("sort") and not index_serves_sort(db, shape["collection"], shape["filter"], shape["sort"]):
+                stages.insert(0, "SORT")
+        rows.append({
+            "route": shape["route"],
+            "collection": shape["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages and not shape.get("full_scan"),
+            # SORT_MERGE streams already-sorted inputs; only SORT buffers every match in memory
+            "blocking_sort": "SORT" in stages,
+        })
+    return rows
+
+
+def print_audit(rows):
+    for row in rows:
+        marker = "❌ COLLSCAN" if row["collscan"] else "❌ SORT" if row["blocking_sort"] else "✅"
+        print(f"{marker:12} {row['collection']:18} {' <- '.join(row['stages']):32} {row['route']}")
+    flagged = sum(row["collscan"] or row["blocking_sort"] for row in rows)
+    print(f"{flagged} of {len(rows)} query shapes fall back to a collection scan or a blocking sort")
+    return flagged
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description="Create declared indexes or audit query plans")
+    parser.add_argument("command", choices=["ensure", "audit"])
+    parser.add_argument("--mongo-uri", default=None, help="defaults to MONGO_URI")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = MongoClient(args.mongo_uri or os.getenv("MONGO_URI")).get_default_database()
+    if args.command == "ensure":
+        for collection, names in ensure_indexes(db).items():
+            print(f"{collection}: {', '.join(names)}")
+        return 0
+    return 1 if print_audit(audit_queries(db)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
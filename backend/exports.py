@@ -0,0 +1,102 @@
+# exports.py
+# Constant-memory JSON / NDJSON / CSV exports straight off a Mongo cursor.
+import csv
+import io
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_BATCH_SIZE = 500
+
+
+def serialize_document(doc):
+    """Convert ObjectId and datetime values into JSON-friendly strings."""
+    out = {}
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        out[key] = value
+    return out
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def export_sort(date_field):
+    """Export order: by date, with _id breaking ties, so one compound index serves filter, sort and keyset."""
+    return [(date_field, 1), ('_id', 1)]
+
+
+def build_export_query(args, date_field, max_limit, collection):
+    """
+    Translate export query-string arguments into (filter, limit, format).
+    Supports university_id, from/to on `date_field` and keyset pagination
+    with `after` (the last _id of the previous page). Pages follow
+    export_sort(), so `after` is resolved to its (date, _id) position.
+    Raises ValueError on malformed input so the route can answer 400
+    before streaming starts.
+    """
+    export_format = args.get('format', 'json').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    query = {}
+    if args.get('university_id'):
+        query['university_id'] = args['university_id']
+    date_from, date_to = parse_date(args.get('from')), parse_date(args.get('to'))
+    if date_from or date_to:
+        query[date_field] = {}
+        if date_from:
+            query[date_field]['$gte'] = date_from
+        if date_to:
+            query[date_field]['$lt'] = date_to
+    if args.get('after'):
+        if not ObjectId.is_valid(args['after']):
+            raise ValueError("after must be a valid ObjectId")
+        after_id = ObjectId(args['after'])
+        anchor = collection.find_one({'_id': after_id}, {date_field: 1})
+        if anchor is None or anchor.get(date_field) is None:
+            raise ValueError("after does not match an exported document")
+        anchor_date = anchor[date_field]
+        # The range bound keeps the index scan tight; the $or only skips the anchor date's earlier ties
+        query['$and'] = [
+            {date_field: {'$gte': anchor_date}},
+            {'$or': [{date_field: {'$gt': anchor_date}}, {'_id': {'$gt': after_id}}]},
+        ]
+
+    limit = args.get('limit')
+    limit = min(max(int(limit), 1), max_limit) if limit else None
+    return query, limit, export_format
+
+
+def stream_export(cursor, export_format, columns):
+    """Yield the cursor's documents encoded as a JSON array, NDJSON lines or CSV rows."""
+    if export_format == 'ndjson':
+        for doc in cursor:
+            yield json.dumps(serialize_document(doc), default=str) + "\n"
+    elif export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for doc in cursor:
+            writer.writerow(serialize_document(doc))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        yield "["
+        first = True
+        for doc in cursor:
+            yield ("" if first else ",") + json.dumps(serialize_document(doc), default=str)
+            first = False
+        yield "]"
@@ -136,4 +136,14 @@ model_save_path = '/content/drive/MyDrive/Final project/university_recommendatio
 # Save the entire trained pipeline to the specified path
 joblib.dump(model_pipeline, model_save_path)
 
-print(f"✅ Model pipeline saved successfully to: {model_save_path}")
\ No newline at end of file
+print(f"✅ Model pipeline saved successfully to: {model_save_path}")
+
+# --- Export the compact model for the API server ---
+# The server memory-maps this directory instead of unpickling the joblib file in every worker.
+# Upload backend/compact_model.py to the Colab session so it can be imported here.
+from compact_model import export_compact_model
+
+compact_save_path = '/content/drive/MyDrive/Final project/university_recommendation_model.compact'
+compact_meta = export_compact_model(model_pipeline, compact_save_path)
+
+print(f"✅ Compact model ({compact_meta['n_trees']} trees) saved successfully to: {compact_save_path}")
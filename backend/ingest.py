@@ -0,0 +1,194 @@
+# ingest.py
+# Bulk-load the university catalogue from the degrees CSV.
+#
+#   python ingest.py                                   # the bundled CSV
+#   python ingest.py other.csv --chunk-size 50000
+#
+# The CSV repeats every university's and program's attributes on each
+# student row. It is streamed in chunks, normalized, and collapsed to one
+# document per university with its degree programs embedded, then written
+# with unordered bulk upserts keyed on university_id. Fields the CSV does
+# not carry (website, image_url, ...) are left as the admins set them.
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from catalogue import bump_stored_version
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV_PATH = os.path.join(BASE_DIR, 'sri_lanka_universities_with_degrees.csv')
+DEFAULT_CHUNK_SIZE = 20000
+DEFAULT_BATCH_SIZE = 500
+
+UNIVERSITY_COLUMNS = ['university_id', 'university_name', 'university_type', 'location',
+                      'hostel_available', 'ranking_score', 'international_affiliation']
+PROGRAM_COLUMNS = ['degree_programs', 'program_description', 'language_mediums',
+                   'semester_fee_lkr', 'entry_requirements']
+TRUE_VALUES = {'true', '1', 'yes', 'y'}
+
+
+def clean(value):
+    """Collapse runs of whitespace; empty cells become None."""
+    text = " ".join(str(value).split())
+    return text or None
+
+
+def parse_bool(value):
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def parse_number(value, cast):
+    try:
+        return cast(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_mediums(value):
+    return sorted({medium for medium in (clean(part) for part in str(value).split(',')) if medium})
+
+
+def read_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """`source` is a path or a binary file object (an upload stream); only the catalogue columns are parsed."""
+    return pd.read_csv(source, usecols=UNIVERSITY_COLUMNS + PROGRAM_COLUMNS, dtype=str,
+                       keep_default_na=False, chunksize=chunk_size)
+
+
+class CatalogueBuilder:
+    """
+    Folds CSV chunks into one document per university. Only the first row
+    seen for a (university, program) pair is kept, so memory grows with the
+    size of the catalogue, not with the number of rows.
+    """
+
+    def __init__(self):
+        self.universities = {}
+        self.rows = 0
+        self.skipped = 0
+
+    def add_chunk(self, chunk):
+        self.rows += len(chunk)
+        for col in ('university_id', 'degree_programs'):
+            chunk[col] = chunk[col].map(clean)
+        missing = chunk['university_id'].isna() | chunk['degree_programs'].isna()
+        self.skipped += int(missing.sum())
+        # Most rows repeat a pair already seen; drop them before any per-row work
+        chunk = chunk[~missing].drop_duplicates(subset=['university_id', 'degree_programs'])
+
+        for row in chunk.itertuples(index=False):
+            university = self.universities.get(row.university_id)
+            if university is None:
+                university = self.universities[row.university_id] = {
+                    "university_id": row.university_id,
+                    "name": clean(row.university_name),
+                    "university_type": clean(row.university_type),
+                    "location": clean(row.location),
+                    "ranking": parse_number(row.ranking_score, float),
+                    "hostel_available": parse_bool(row.hostel_available),
+                    "international_affiliation": parse_bool(row.international_affiliation),
+                    "programs": {},
+                }
+            if row.degree_programs in university["programs"]:
+                continue
+            university["programs"][row.degree_programs] = {
+                "name": row.degree_programs,
+                "description": clean(row.program_description),
+                "language_mediums": parse_mediums(row.language_mediums),
+                "semester_fee_lkr": parse_number(row.semester_fee_lkr, int),
+                "entry_requirements": clean(row.entry_requirements),
+            }
+
+    def documents(self):
+        for university in self.universities.values():
+            doc = {k: v for k, v in university.items() if k != "programs"}
+            programs = sorted(university["programs"].values(), key=lambda p: p["name"])
+            doc["degree_programs"] = programs
+            doc["language_mediums"] = sorted({m for p in programs for m in p["language_mediums"]})
+            fees = [p["semester_fee_lkr"] for p in programs if p["semester_fee_lkr"] is not None]
+            doc["semester_fee_lkr_range"] = [min(fees), max(fees)] if fees else None
+            yield doc
+
+
+def write_catalogue(collection, docs, batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert `docs` by university_id in unordered bulk writes. Returns (upserted, modified, errors)."""
+    upserted = modified = errors = 0
+    batch = []
+
+    def flush():
+        nonlocal upserted, modified, errors
+        try:
+            result = collection.bulk_write(batch, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            errors += len(result.get('writeErrors', []))
+        upserted += result.get('nUpserted', 0)
+        modified += result.get('nModified', 0)
+        batch.clear()
+
+    for doc in docs:
+        batch.append(UpdateOne({"university_id": doc["university_id"]}, {"$set": doc}, upsert=True))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return upserted, modified, errors
+
+
+def ingest_catalogue(db, source=DEFAULT_CSV_PATH, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream `source` into db.universities. Returns a report with counts and rows/sec."""
+    start = time.perf_counter()
+    builder = CatalogueBuilder()
+    for chunk in read_chunks(source, chunk_size):
+        builder.add_chunk(chunk)
+    docs = list(builder.documents())
+    parsed = time.perf_counter()
+
+    upserted, modified, errors = write_catalogue(db.universities, docs, batch_size)
+    # Tells every running worker to reload its in-memory catalogue
+    bump_stored_version(db.catalogue_state)
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": builder.rows,
+        "skipped_rows": builder.skipped,
+        "universities": len(docs),
+        "programs": sum(len(doc["degree_programs"]) for doc in docs),
+        "upserted": upserted,
+        "modified": modified,
+        "errors": errors,
+        "seconds": {"parse": round(parsed - start, 3), "write": round(elapsed - (parsed - start), 3)},
+        "rows_per_second": round(builder.rows / elapsed) if elapsed > 0 else None,
+    }
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description="Load universities and degree programs from the degrees CSV")
+    parser.add_argument("csv", nargs="?", default=DEFAULT_CSV_PATH)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="CSV rows parsed at a time")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="upserts per bulk_write")
+    parser.add_argument("--mongo-uri", default=None, help="defaults to MONGO_URI")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = MongoClient(args.mongo_uri or os.getenv("MONGO_URI")).get_default_database()
+    report = ingest_catalogue(db, args.csv, args.chunk_size, args.batch_size)
+    print(f"✅ {report['rows']} rows -> {report['universities']} universities, {report['programs']} programs "
+          f"({report['upserted']} inserted, {report['modified']} updated)")
+    print(f"   {report['rows_per_second']} rows/sec  "
+          f"(parse {report['seconds']['parse']:.2f}s, write {report['seconds']['write']:.2f}s)")
+    if report['skipped_rows']:
+        print(f"⚠️ {report['skipped_rows']} rows without a university_id or program were skipped")
+    if report['errors']:
+        print(f"❌ {report['errors']} universities failed to write")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# jobs.py
+# Small in-process background job runner for slow, I/O-bound work.
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """
+    Runs submitted callables on a bounded thread pool and keeps their status
+    for polling. Submitting a key that already has a queued or running job
+    returns that job instead of starting a duplicate.
+    """
+
+    def __init__(self, max_workers=4, retention_seconds=3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_by_key = {}
+        self.retention_seconds = retention_seconds
+
+    def submit(self, key, fn, *args, **kwargs):
+        job, public = self._new_job(key)
+        if job is not None:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        return public
+
+    def _new_job(self, key):
+        """
+        Register a queued job for `key`. Returns (job, public copy), or
+        (None, public copy of the active job) when `key` already has one.
+        """
+        with self._lock:
+            self._prune()
+            active_id = self._active_by_key.get(key)
+            if active_id is not None:
+                return None, self._public(self._jobs[active_id])
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "key": key,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "finished_at": None,
+            }
+            self._jobs[job["job_id"]] = job
+            self._active_by_key[key] = job["job_id"]
+            # Copied before the job is scheduled: a fast job could otherwise answer 202 with "done"
+            return job, self._public(job)
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            job["status"] = "running"
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                job["status"] = "failed"
+                job["error"] = str(e)
+        else:
+            with self._lock:
+                job["status"] = "done"
+                job["result"] = result
+        finally:
+            with self._lock:
+                job["finished_at"] = time.time()
+                self._active_by_key.pop(job["key"], None)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j for j, job in self._jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _public(job):
+        return {k: v for k, v in job.items() if k != "key"}
+
+
+class AsyncJobQueue(JobQueue):
+    """
+    JobQueue for coroutines on the running event loop, with the same
+    key deduplication, status fields and retention as the threaded queue.
+    """
+
+    def __init__(self, max_concurrency=4, retention_seconds=3600):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_by_key = {}
+        self._tasks = set()
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self.retention_seconds = retention_seconds
+
+    def submit(self, key, coro_fn, *args, **kwargs):
+        job, public = self._new_job(key)
+        if job is not None:
+            task = asyncio.ensure_future(self._arun(job, coro_fn, args, kwargs))
+            # Keep a reference so the task is not garbage-collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return public
+
+    async def _arun(self, job, coro_fn, args, kwargs):
+        async with self._limit:
+            job["status"] = "running"
+            try:
+                job["result"] = await coro_fn(*args, **kwargs)
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                with self._lock:
+                    job["finished_at"] = time.time()
+                    self._active_by_key.pop(job["key"], None)
@@ -0,0 +1,432 @@
+# llm_gateway.py
+# One shared entry point for chat completions: pooled client, bounded
+# concurrency, single-flight deduplication, TTL response cache and metrics.
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class OpenAIBackend:
+    """Chat completions through a single long-lived OpenAI client (one HTTP connection pool)."""
+
+    name = "openai"
+
+    def __init__(self, api_key, timeout=30.0, max_retries=2):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._aclient = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Created on first use so a missing API key only fails the LLM routes, not app startup
+        with self._lock:
+            if self._client is None:
+                import openai
+                self._client = openai.OpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=self.max_retries)
+            return self._client
+
+    @property
+    def aclient(self):
+        with self._lock:
+            if self._aclient is None:
+                import openai
+                self._aclient = openai.AsyncOpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=self.max_retries)
+            return self._aclient
+
+    def complete(self, model, messages, temperature, max_tokens):
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        usage = response.usage
+        return response.choices[0].message.content, {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+
+    def stream(self, model, messages, temperature, max_tokens, usage):
+        """Yield completion text deltas as they arrive; closing the generator closes the HTTP stream."""
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in response:
+                if chunk.usage:
+                    usage["prompt_tokens"] = chunk.usage.prompt_tokens or 0
+                    usage["completion_tokens"] = chunk.usage.completion_tokens or 0
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()
+
+    async def acomplete(self, model, messages, temperature, max_tokens):
+        response = await self.aclient.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        usage = response.usage
+        return response.choices[0].message.content, {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+
+    async def astream(self, model, messages, temperature, max_tokens, usage):
+        response = await self.aclient.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in response:
+                if chunk.usage:
+                    usage["prompt_tokens"] = chunk.usage.prompt_tokens or 0
+                    usage["completion_tokens"] = chunk.usage.completion_tokens or 0
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await response.close()
+
+
+class FakeBackend:
+    """Offline stand-in that answers after a fixed delay, for load tests and local development."""
+
+    name = "fake"
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+
+    def complete(self, model, messages, temperature, max_tokens):
+        time.sleep(self.delay)
+        return self._answer(model, messages, max_tokens)
+
+    def stream(self, model, messages, temperature, max_tokens, usage):
+        answer, counts = self.complete(model, messages, temperature, max_tokens)
+        usage.update(counts)
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.delay / max(len(words), 1))
+            yield word if i == 0 else " " + word
+
+    def _answer(self, model, messages, max_tokens):
+        prompt = messages[-1]["content"]
+        answer = f"[{model}] " + " ".join(prompt.split()[:max_tokens])[:500]
+        return answer, {"prompt_tokens": len(prompt.split()), "completion_tokens": len(answer.split())}
+
+    async def acomplete(self, model, messages, temperature, max_tokens):
+        await asyncio.sleep(self.delay)
+        return self._answer(model, messages, max_tokens)
+
+    async def astream(self, model, messages, temperature, max_tokens, usage):
+        answer, counts = self._answer(model, messages, max_tokens)
+        usage.update(counts)
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.delay / max(len(words), 1))
+            yield word if i == 0 else " " + word
+
+
+class LLMGateway:
+    """
+    Wraps a backend so that at most `max_concurrency` calls run at once,
+    identical in-flight prompts share one upstream call, and answers are
+    reused from a prompt-hash cache for `cache_ttl` seconds.
+    """
+
+    def __init__(self, backend, max_concurrency=8, cache_ttl=3600, cache_size=1000, acquire_timeout=30.0,
+                 on_upstream=None):
+        self.backend = backend
+        # Optional callback(elapsed_seconds, kind) after every upstream call, e.g. a latency histogram
+        self.on_upstream = on_upstream
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # The async paths get their own limit and in-flight table on the event loop
+        self._asemaphore = None
+        self._ainflight = {}
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._metrics = {
+            "requests": 0,
+            "upstream_calls": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "latency_seconds_total": 0.0,
+            "latency_seconds_max": 0.0,
+            "streams": 0,
+            "streams_cancelled": 0,
+            "first_token_seconds_total": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    @staticmethod
+    def prompt_key(model, messages, temperature, max_tokens):
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def complete(self, messages, model="gpt-4-turbo", temperature=0.7, max_tokens=500):
+        key = self.prompt_key(model, messages, temperature, max_tokens)
+        with self._lock:
+            self._metrics["requests"] += 1
+            answer = self._cached(key)
+            if answer is not None:
+                self._metrics["cache_hits"] += 1
+                return answer
+            leader = self._inflight.get(key)
+            if leader is not None:
+                self._metrics["coalesced"] += 1
+            else:
+                future = Future()
+                self._inflight[key] = future
+        if leader is not None:
+            return leader.result()
+
+        try:
+            answer = self._call_upstream(model, messages, temperature, max_tokens)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(answer)
+            return answer
+        finally:
+            # Cached before the in-flight entry goes, so no caller misses both and calls upstream again
+            if future.done() and future.exception() is None:
+                self._store(key, future.result())
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _call_upstream(self, model, messages, temperature, max_tokens):
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise TimeoutError("LLM gateway is saturated, try again later")
+        start = time.perf_counter()
+        try:
+            answer, usage = self.backend.complete(model, messages, temperature, max_tokens)
+        except Exception:
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise
+        finally:
+            self._semaphore.release()
+        self._record_upstream(time.perf_counter() - start, usage)
+        return answer
+
+    def stream(self, messages, model="gpt-4-turbo", temperature=0.7, max_tokens=500):
+        """
+        Yield the completion in chunks as the backend produces them. Cached
+        answers come back as a single chunk; a completed stream is cached for
+        later requests. Closing the generator (client gone) cancels upstream.
+        """
+        key = self.prompt_key(model, messages, temperature, max_tokens)
+        with self._lock:
+            self._metrics["requests"] += 1
+            answer = self._cached(key)
+            if answer is not None:
+                self._metrics["cache_hits"] += 1
+        if answer is not None:
+            yield answer
+            return
+
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise TimeoutError("LLM gateway is saturated, try again later")
+        start = time.perf_counter()
+        first_token = None
+        usage = {}
+        parts = []
+        completed = False
+        upstream = self.backend.stream(model, messages, temperature, max_tokens, usage)
+        try:
+            for chunk in upstream:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(chunk)
+                yield chunk
+            completed = True
+        except GeneratorExit:
+            with self._lock:
+                self._metrics["streams_cancelled"] += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise
+        finally:
+            upstream.close()
+            self._semaphore.release()
+            self._record_upstream(time.perf_counter() - start, usage, first_token or 0.0)
+            if completed:
+                self._store(key, "".join(parts))
+
+    def _record_upstream(self, elapsed, usage, first_token=None):
+        with self._lock:
+            self._metrics["upstream_calls"] += 1
+            self._metrics["latency_seconds_total"] += elapsed
+            self._metrics["latency_seconds_max"] = max(self._metrics["latency_seconds_max"], elapsed)
+            self._metrics["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self._metrics["completion_tokens"] += usage.get("completion_tokens", 0)
+            if first_token is not None:
+                self._metrics["streams"] += 1
+                self._metrics["first_token_seconds_total"] += first_token
+        if self.on_upstream is not None:
+            self.on_upstream(elapsed, "stream" if first_token is not None else "complete")
+
+    def _store(self, key, answer):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, answer)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            self._metrics["requests"] += 1
+            answer = self._cached(key)
+            if answer is not None:
+                self._metrics["cache_hits"] += 1
+            return answer
+
+    async def _acquire_async(self):
+        if self._asemaphore is None:
+            self._asemaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._asemaphore.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise TimeoutError("LLM gateway is saturated, try again later")
+
+    async def acomplete(self, messages, model="gpt-4-turbo", temperature=0.7, max_tokens=500):
+        """
+        Async counterpart of complete(), sharing the response cache and metrics.
+        The upstream call runs in its own task that every caller awaits through
+        asyncio.shield(), so a caller that is cancelled (a client disconnect)
+        neither cancels the call nor fails the requests coalesced onto it.
+        """
+        key = self.prompt_key(model, messages, temperature, max_tokens)
+        answer = self._lookup(key)
+        if answer is not None:
+            return answer
+        task = self._ainflight.get(key)
+        if task is not None:
+            with self._lock:
+                self._metrics["coalesced"] += 1
+        else:
+            task = asyncio.get_running_loop().create_task(
+                self._aupstream(key, model, messages, temperature, max_tokens)
+            )
+            self._ainflight[key] = task
+            task.add_done_callback(lambda done: self._afinish(key, done))
+        return await asyncio.shield(task)
+
+    async def _aupstream(self, key, model, messages, temperature, max_tokens):
+        await self._acquire_async()
+        start = time.perf_counter()
+        try:
+            answer, usage = await self.backend.acomplete(model, messages, temperature, max_tokens)
+        except Exception:
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise
+        finally:
+            self._asemaphore.release()
+        self._record_upstream(time.perf_counter() - start, usage)
+        self._store(key, answer)
+        return answer
+
+    def _afinish(self, key, task):
+        if self._ainflight.get(key) is task:
+            del self._ainflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved so a failure nobody awaited any more is not logged
+
+    async def astream(self, messages, model="gpt-4-turbo", temperature=0.7, max_tokens=500):
+        """Async counterpart of stream(); cancellation of the consumer closes the upstream stream."""
+        key = self.prompt_key(model, messages, temperature, max_tokens)
+        answer = self._lookup(key)
+        if answer is not None:
+            yield answer
+            return
+
+        await self._acquire_async()
+        start = time.perf_counter()
+        first_token = None
+        usage = {}
+        parts = []
+        completed = False
+        upstream = self.backend.astream(model, messages, temperature, max_tokens, usage)
+        try:
+            async for chunk in upstream:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(chunk)
+                yield chunk
+            completed = True
+        except (GeneratorExit, asyncio.CancelledError):
+            with self._lock:
+                self._metrics["streams_cancelled"] += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise
+        finally:
+            await upstream.aclose()
+            self._asemaphore.release()
+            self._record_upstream(time.perf_counter() - start, usage, first_token or 0.0)
+            if completed:
+                self._store(key, "".join(parts))
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            calls = metrics["upstream_calls"]
+            metrics["latency_seconds_avg"] = metrics["latency_seconds_total"] / calls if calls else 0
+            streams = metrics["streams"]
+            metrics["first_token_seconds_avg"] = metrics["first_token_seconds_total"] / streams if streams else 0
+            metrics["in_flight"] = len(self._inflight)
+            metrics["cache_size"] = len(self._cache)
+            metrics["backend"] = self.backend.name
+            metrics["max_concurrency"] = self.max_concurrency
+            return metrics
+
+
+def create_backend(name, api_key=None, timeout=30.0, fake_delay=0.05):
+    if name == "fake":
+        return FakeBackend(delay=fake_delay)
+    return OpenAIBackend(api_key=api_key, timeout=timeout)
@@ -0,0 +1,214 @@
+# metrics.py
+# Latency histograms in Prometheus text format, plus a sampling profiler for slow requests.
+#
+# Metrics live in the process that records them; with several workers each
+# one serves its own /metrics, so scrape every worker (or run a single one).
+import bisect
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+# Seconds; wide enough for sub-millisecond cache hits and multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding every command's server round trip into a histogram."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self._collections = {}
+
+    def started(self, event):
+        command = event.command
+        target = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+    def _observe(self, event, outcome):
+        collection = self._collections.pop(event.request_id, "")
+        self.histogram.observe(event.duration_micros / 1e6, event.command_name, collection, outcome)
+
+
+def outbound_response_hook(histogram):
+    """requests response hook recording time-to-headers per method and status class."""
+    def hook(response, *args, **kwargs):
+        histogram.observe(response.elapsed.total_seconds(), response.request.method, f"{response.status_code // 100}xx")
+        return response
+    return hook
+
+
+class SlowRequestProfiler:
+    """
+    Samples the stack of a random `sample_rate` share of requests every
+    `interval` seconds from one background thread. When a sampled request
+    turns out slower than `threshold` seconds, its stacks are written to
+    `out_dir` in collapsed "frame;frame;frame count" form, ready for
+    flamegraph.pl or speedscope. Unsampled requests pay one random() call.
+    """
+
+    def __init__(self, out_dir, sample_rate=0.01, threshold=0.5, interval=0.005):
+        self.out_dir = out_dir
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        os.makedirs(out_dir, exist_ok=True)
+
+    def begin(self):
+        if random.random() >= self.sample_rate:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._active[threading.get_ident()] = Counter()
+        self._wake.set()
+
+    def end(self, route, elapsed):
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if stacks and elapsed >= self.threshold:
+            name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+            path = os.path.join(self.out_dir, f"{name}-{int(time.time() * 1000)}-{os.getpid()}.folded")
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{route};{stack} {count}\n")
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stacks in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+
+def instrument_flask(app, histogram, profiler=None):
+    """
+    Time every request around Flask's full_dispatch_request (for streamed
+    responses that is the time to the first byte, not the whole body).
+    Wrapping the one method keeps the cost to a few microseconds, well
+    under what before/after_request hooks add to a fast route.
+    """
+    from flask import request
+
+    dispatch = app.full_dispatch_request
+
+    def timed_dispatch():
+        if profiler is not None:
+            profiler.begin()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = dispatch()
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            req = request._get_current_object()
+            route = req.url_rule.rule if req.url_rule is not None else "unmatched"
+            histogram.observe(elapsed, req.method, route, status)
+            if profiler is not None:
+                profiler.end(route, elapsed)
+
+    app.full_dispatch_request = timed_dispatch
@@ -0,0 +1,118 @@
+# passwords.py
+# bcrypt hashing on a bounded process pool, plus short-lived session tokens.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check_password(pw_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), pw_hash.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def hash_rounds(pw_hash):
+    """Cost factor stored in a "$2b$<rounds>$..." hash, or None if it is not a bcrypt hash."""
+    parts = pw_hash.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a pool of worker processes so hashing scales with cores
+    rather than with request threads. At most `max_pending` hashes may be
+    queued; callers beyond that wait up to `acquire_timeout` seconds and then
+    get a TimeoutError, so a login spike sheds load instead of piling up.
+    """
+
+    def __init__(self, rounds=12, max_workers=None, max_pending=64, acquire_timeout=5.0):
+        self.rounds = rounds
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    @property
+    def executor(self):
+        # Created on first use and again after a fork, so each worker process owns its pool.
+        # Never "fork": copying a threaded server can copy locks held by other threads.
+        # The fork server preloads only this module, not the app's __main__ and its startup.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload([__name__])
+                else:
+                    context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("Password hashing is saturated, try again later")
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        return self._run(_hash_password, password, self.rounds)
+
+    def hash_inline(self, password):
+        """Hash on the calling thread, for startup code: a pool cannot be started while the app module is importing."""
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        return _hash_password(password, self.rounds)
+
+    def verify(self, pw_hash, password):
+        if not pw_hash or not password:
+            return False
+        return self._run(_check_password, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return hash_rounds(pw_hash) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class SessionTokens:
+    """
+    Signed, expiring tokens that carry a user's public profile. A valid
+    token is proof of a recent login, so profile reads can be answered
+    without another database round trip.
+    """
+
+    def __init__(self, secret_key, max_age=900, salt="user-session"):
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=salt)
+
+    def issue(self, user):
+        return self._serializer.dumps({k: v for k, v in user.items() if k != "password"})
+
+    def verify(self, token):
+        """The profile stored in `token`, or None if it is missing, forged or expired."""
+        if not token:
+            return None
+        try:
+            return self._serializer.loads(token, max_age=self.max_age)
+        except (SignatureExpired, BadSignature):
+            return None
@@ -0,0 +1,130 @@
+# prediction_cache.py
+# LRU + TTL cache of model outputs keyed on a canonicalized student profile.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def stat_signature(path):
+    """(path, mtime, size) of a model file or of every file in a model directory; changes when it is rewritten."""
+    paths = [os.path.realpath(path)]
+    if os.path.isdir(path):
+        paths = [os.path.join(os.path.realpath(path), name) for name in sorted(os.listdir(path))]
+    signature = []
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def fingerprinted_load(path, load, attempts=3):
+    """
+    Load a model with `load(path)` and return (model, fingerprint) for the
+    exact files that were loaded. The fingerprint hashes their stat
+    signature, so it costs a stat() rather than a read of the whole model.
+    A file rewritten during the load changes it, and the load is retried.
+    """
+    for _ in range(attempts):
+        signature = stat_signature(path)
+        loaded = load(path)
+        if stat_signature(path) == signature:
+            return loaded, hashlib.sha256(repr(signature).encode('utf-8')).hexdigest()
+    raise RuntimeError(f"{path} kept changing while it was being loaded")
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL. Keys carry the fingerprint
+    of the model this process actually loaded, so entries can only ever
+    describe that model; a retrained model is picked up by restarting the
+    workers, which starts them with a fresh cache.
+    """
+
+    def __init__(self, feature_columns, maxsize=10000, ttl_seconds=3600, budget_bucket=0, model_hash=None):
+        self.feature_columns = list(feature_columns)
+        self.maxsize = maxsize
+        self.ttl = ttl_seconds
+        self.budget_bucket = budget_bucket
+        self.model_hash = model_hash
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def normalize(self, profile):
+        """Canonical copy of a profile; with budget bucketing the budget snaps to its bucket midpoint."""
+        normalized = {}
+        for column in self.feature_columns:
+            value = profile.get(column)
+            if isinstance(value, str):
+                value = value.strip()
+            elif isinstance(value, bool):
+                value = int(value)
+            elif isinstance(value, (int, float)):
+                value = float(value)
+            normalized[column] = value
+        budget = normalized.get('budget')
+        if self.budget_bucket and isinstance(budget, float):
+            normalized['budget'] = (budget // self.budget_bucket) * self.budget_bucket + self.budget_bucket / 2
+        return normalized
+
+    def key(self, normalized_profile, variant=None):
+        return (self.model_hash, variant) + tuple(normalized_profile[column] for column in self.feature_columns)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "budget_bucket": self.budget_bucket,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "model_hash": self.model_hash,
+            }
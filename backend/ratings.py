@@ -0,0 +1,162 @@
+# ratings.py
+# Running per-university rating aggregates kept next to the feedback collection.
+#
+# Each document in `rating_aggregates` looks like
+#   {"university_id": "P024", "sum": 37, "count": 9, "histogram": {"4": 5, "5": 4}, "version": 12,
+#    "as_of": datetime(...)}
+# and is maintained with atomic $inc updates, so reading an average never
+# touches the feedback documents themselves. `version` counts the updates;
+# `as_of` is the newest feedback timestamp the last rebuild counted.
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+
+def validate_rating(rating):
+    """Return `rating` if it is a number from MIN_RATING to MAX_RATING, else raise ValueError."""
+    # bool is an int subclass, and a string rating would break the $inc arithmetic
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not MIN_RATING <= rating <= MAX_RATING:
+        raise ValueError(f"rating must be a number from {MIN_RATING} to {MAX_RATING}")
+    return rating
+
+
+def histogram_key(rating):
+    # Field names cannot contain '.', so 4.5 is stored as "4_5"
+    return str(rating).replace('.', '_')
+
+
+def apply_rating_change(db, university_id, old_rating=None, new_rating=None, as_of=None):
+    """
+    Fold one new, changed or removed rating into the university's aggregate.
+    `as_of` is the timestamp written with the feedback change; a rebuild that
+    already counted feedback that new has this change in it, and the fold is
+    skipped. Returns False when it was skipped.
+    """
+    inc = {}
+    if old_rating is not None:
+        inc['sum'] = -old_rating
+        inc['count'] = -1
+        inc[f"histogram.{histogram_key(old_rating)}"] = -1
+    if new_rating is not None:
+        inc['sum'] = inc.get('sum', 0) + new_rating
+        inc['count'] = inc.get('count', 0) + 1
+        new_key = f"histogram.{histogram_key(new_rating)}"
+        inc[new_key] = inc.get(new_key, 0) + 1
+    inc = {field: delta for field, delta in inc.items() if delta != 0}
+    if inc:
+        # Every change bumps the version, which is what lets a rebuild detect it raced with this update
+        inc['version'] = 1
+        query = {"university_id": university_id}
+        if as_of is not None:
+            # {"as_of": None} also matches aggregates no rebuild has stamped
+            query["$or"] = [{"as_of": {"$lt": as_of}}, {"as_of": None}]
+        try:
+            db.rating_aggregates.update_one(query, {"$inc": inc}, upsert=True)
+        except DuplicateKeyError:
+            # The aggregate exists but a rebuild already counted this change (unique index on university_id)
+            return False
+    return True
+
+
+def _aggregate_versions(db, university_ids=None):
+    query = {} if university_ids is None else {"university_id": {"$in": list(university_ids)}}
+    return {
+        doc['university_id']: doc.get('version')
+        for doc in db.rating_aggregates.find(query, {"_id": 0, "university_id": 1, "version": 1})
+    }
+
+
+def _compute_aggregates(db, university_ids=None):
+    # Only numeric ratings count; anything else stored by older code is skipped rather than failing the rebuild
+    match = {"rating": {"$type": "number"}}
+    if university_ids is not None:
+        match["university_id"] = {"$in": list(university_ids)}
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": {"university_id": "$university_id", "rating": "$rating"}, "n": {"$sum": 1},
+                    "as_of": {"$max": "$timestamp"}}},
+    ]
+    aggregates = {}
+    for row in db.feedback.aggregate(pipeline):
+        university_id = row['_id']['university_id']
+        rating = row['_id']['rating']
+        aggregate = aggregates.setdefault(
+            university_id, {"university_id": university_id, "sum": 0, "count": 0, "histogram": {}, "as_of": None}
+        )
+        if row.get('as_of') is not None and (aggregate['as_of'] is None or row['as_of'] > aggregate['as_of']):
+            aggregate['as_of'] = row['as_of']
+        aggregate['sum'] += rating * row['n']
+        aggregate['count'] += row['n']
+        aggregate['histogram'][histogram_key(rating)] = row['n']
+    return aggregates
+
+
+def rebuild_rating_aggregates(db, university_ids=None, max_attempts=5):
+    """
+    Recompute aggregates from the feedback collection, for all or only the
+    given universities. Each aggregate is replaced only if its version is
+    still the one read before the feedback was aggregated; a concurrent
+    apply_rating_change() bumps the version, and that university is then
+    recomputed instead of losing the update. A change whose feedback write
+    the rebuild already counted but whose $inc lands after the replace is
+    skipped through the `as_of` watermark, instead of being counted twice.
+    """
+    scope = None if university_ids is None else set(university_ids)
+    rebuilt = 0
+    for _ in range(max_attempts):
+        versions = _aggregate_versions(db, scope)
+        aggregates = _compute_aggregates(db, scope)
+        operations = []
+        expected = {}
+        for university_id, doc in aggregates.items():
+            version = versions.get(university_id)
+            # {"version": None} also matches documents written before versions existed
+            operations.append(ReplaceOne({"university_id": university_id, "version": version},
+                                         {**doc, "version": (version or 0) + 1}, upsert=True))
+            expected[university_id] = (version or 0) + 1
+        for university_id in set(versions) - set(aggregates):
+            operations.append(DeleteOne({"university_id": university_id, "version": versions[university_id]}))
+            expected[university_id] = None
+        if operations:
+            try:
+                db.rating_aggregates.bulk_write(operations, ordered=False)
+            except BulkWriteError:
+                # A guarded upsert lost to a concurrent insert (duplicate key); found below and retried
+                pass
+
+        current = _aggregate_versions(db, expected)
+        conflicts = {uid for uid, version in expected.items() if current.get(uid) != version}
+        rebuilt += len(set(aggregates) - conflicts)
+        if not conflicts:
+            return rebuilt
+        scope = conflicts
+    raise RuntimeError(f"Rating aggregates kept changing during rebuild: {sorted(scope)}")
+
+
+def summarize(aggregate):
+    if not aggregate or not aggregate.get('count'):
+        return {"average_rating": 0, "count": 0, "histogram": {}}
+    return {
+        "average_rating": aggregate['sum'] / aggregate['count'],
+        "count": aggregate['count'],
+        "histogram": {k: v for k, v in aggregate.get('histogram', {}).items() if v}
+    }
+
+
+def read_rating_aggregates(db, university_ids):
+    """Averages for many universities with a single $in query."""
+    found = {
+        doc['university_id']: doc
+        for doc in db.rating_aggregates.find({"university_id": {"$in": list(university_ids)}}, {"_id": 0})
+    }
+    return {university_id: summarize(found.get(university_id)) for university_id in university_ids}
+
+
+async def aread_rating_aggregates(db, university_ids):
+    """read_rating_aggregates() for an async (Motor) database handle."""
+    cursor = db.rating_aggregates.find({"university_id": {"$in": list(university_ids)}}, {"_id": 0})
+    found = {doc['university_id']: doc async for doc in cursor}
+    return {university_id: summarize(found.get(university_id)) for university_id in university_ids}
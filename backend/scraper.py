@@ -0,0 +1,229 @@
+# scraper.py
+# Concurrent, size-capped page fetching with incremental text extraction.
+import asyncio
+import codecs
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TEXT_TAGS = {"p", "h1", "h2", "h3"}
+SKIP_TAGS = {"script", "style", "noscript"}
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+
+def incremental_decoder(encoding):
+    """A replacing decoder for the charset a page declares; unknown or bogus charsets fall back to UTF-8."""
+    try:
+        factory = codecs.getincrementaldecoder(encoding or "utf-8")
+    except LookupError:
+        factory = codecs.getincrementaldecoder("utf-8")
+    return factory(errors="replace")
+
+
+class TextExtractor(HTMLParser):
+    """
+    Collects the stripped text of p/h1/h2/h3 elements from HTML fed in
+    chunks, and reports `full` once `budget` characters have been gathered
+    so the caller can stop downloading.
+    """
+
+    def __init__(self, budget=3000):
+        super().__init__(convert_charrefs=True)
+        self.budget = budget
+        self.blocks = []
+        self.length = 0
+        self._depth = 0
+        self._skip = 0
+        self._current = []
+
+    @property
+    def full(self):
+        return self.length >= self.budget
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag in TEXT_TAGS:
+            self._depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in TEXT_TAGS and self._depth:
+            self._depth -= 1
+            if self._depth == 0:
+                self._flush()
+
+    def handle_data(self, data):
+        if self._depth and not self._skip:
+            text = data.strip()
+            if text:
+                self._current.append(text)
+
+    def _flush(self):
+        text = "".join(self._current)
+        self._current = []
+        if text and not self.full:
+            self.blocks.append(text)
+            self.length += len(text) + 1
+
+    def text(self):
+        return " ".join(self.blocks)[:self.budget]
+
+
+class Scraper:
+    """
+    Fetches pages through one pooled requests.Session with keep-alive, caps
+    concurrent requests per host and the bytes read per page, and parses
+    only while the text budget is still open.
+    """
+
+    def __init__(self, max_workers=8, per_host=2, max_bytes=2 * 1024 * 1024, budget=3000, session=None):
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def fetch_text(self, url, timeout=10, stop=None):
+        """
+        Download `url` in chunks and return its headline/paragraph text,
+        stopping at the budget, or between chunks once the `stop` event is set.
+        """
+        extractor = TextExtractor(self.budget)
+        with self._host_limit(url):
+            if stop is not None and stop.is_set():
+                return ""
+            with self.session.get(url, timeout=timeout, stream=True) as res:
+                res.raise_for_status()
+                decoder = incremental_decoder(res.encoding)
+                received = 0
+                for chunk in res.iter_content(chunk_size=16 * 1024):
+                    received += len(chunk)
+                    extractor.feed(decoder.decode(chunk))
+                    if extractor.full or received >= self.max_bytes or (stop is not None and stop.is_set()):
+                        break
+                extractor.close()
+        return extractor.text()
+
+    def gather_text(self, urls, timeout=5, deadline=8):
+        """
+        Fetch all `urls` concurrently and join their text in the given order.
+        Pages still loading when `deadline` seconds have passed are skipped,
+        and their downloads are told to stop so they free the worker threads.
+        """
+        stop = threading.Event()
+        ordered = [self._executor.submit(self.fetch_text, url, timeout, stop) for url in urls]
+        futures = {future: i for i, future in enumerate(ordered)}
+        texts = {}
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                try:
+                    text = future.result()
+                except Exception:
+                    continue
+                if text:
+                    texts[futures[future]] = text
+                # Stop as soon as the pages that come first already fill the budget
+                prefix = 0
+                for i, pending in enumerate(ordered):
+                    if not pending.done():
+                        break
+                    prefix += len(texts.get(i, ""))
+                if prefix >= self.budget:
+                    break
+        except FuturesTimeout:
+            pass
+        stop.set()
+        for future in ordered:
+            future.cancel()
+        return " ".join(texts[i] for i in sorted(texts))[:self.budget]
+
+
+class AsyncScraper:
+    """
+    Event-loop counterpart of Scraper for the ASGI server: one pooled
+    httpx.AsyncClient, the same per-host cap, byte cap and text budget, and
+    pending downloads cancelled once the deadline passes or the budget fills.
+    """
+
+    def __init__(self, max_connections=8, per_host=2, max_bytes=2 * 1024 * 1024, budget=3000, client=None):
+        import httpx
+        self.client = client or httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self._host_limits = {}
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def fetch_text(self, url, timeout=10):
+        extractor = TextExtractor(self.budget)
+        async with self._host_limit(url):
+            async with self.client.stream("GET", url, timeout=timeout) as res:
+                res.raise_for_status()
+                decoder = incremental_decoder(res.encoding)
+                received = 0
+                async for chunk in res.aiter_bytes(chunk_size=16 * 1024):
+                    received += len(chunk)
+                    extractor.feed(decoder.decode(chunk))
+                    if extractor.full or received >= self.max_bytes:
+                        break
+                extractor.close()
+        return extractor.text()
+
+    async def gather_text(self, urls, timeout=5, deadline=8):
+        ordered = [asyncio.ensure_future(self.fetch_text(url, timeout)) for url in urls]
+        index = {task: i for i, task in enumerate(ordered)}
+        texts = {}
+        pending = set(ordered)
+        stop_at = time.monotonic() + deadline
+        try:
+            while pending:
+                remaining = stop_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None and task.result():
+                        texts[index[task]] = task.result()
+                prefix = 0
+                for i, task in enumerate(ordered):
+                    if not task.done():
+                        break
+                    prefix += len(texts.get(i, ""))
+                if prefix >= self.budget:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        return " ".join(texts[i] for i in sorted(texts))[:self.budget]
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,85 @@
+import os
+import sys
+
+# The backend modules import each other as top-level modules (python app.py, uvicorn asgi:app)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import pytest
+
+CSV_PATH = os.path.join(BACKEND_DIR, 'sri_lanka_universities_with_degrees.csv')
+
+
+@pytest.fixture(scope="session")
+def backend(tmp_path_factory):
+    """
+    The app module, imported once against mongomock with a small model
+    trained from the bundled CSV and the offline LLM backend. The catalogue
+    is seeded with one document per university in the CSV.
+    """
+    import flask_pymongo
+    import joblib
+    import mongomock
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import Pipeline
+
+    from compact_model import export_compact_model
+    from train import build_preprocessor, split_features
+
+    df = pd.read_csv(CSV_PATH)
+    X, y = split_features(df)
+    pipeline = Pipeline(steps=[
+        ('preprocessor', build_preprocessor(X)),
+        ('classifier', RandomForestClassifier(n_estimators=10, random_state=42, n_jobs=-1)),
+    ]).fit(X, y)
+    model_dir = tmp_path_factory.mktemp("backend_model")
+    joblib.dump(pipeline, model_dir / "model.joblib")
+    export_compact_model(pipeline, str(model_dir / "model.compact"))
+
+    def mongomock_client(*args, **kwargs):
+        kwargs.pop('driver', None)
+        kwargs.pop('connect', None)
+        return mongomock.MongoClient(*args, **kwargs)
+
+    original_client = flask_pymongo.MongoClient
+    flask_pymongo.MongoClient = mongomock_client
+    os.environ.update({
+        'MONGO_URI': 'mongodb://localhost:27017/university_test',
+        'MODEL_PATH': str(model_dir / "model.joblib"),
+        'COMPACT_MODEL_PATH': str(model_dir / "model.compact"),
+        'LLM_BACKEND': 'fake',
+        'LLM_FAKE_DELAY_SECONDS': '0',
+        'SECRET_KEY': 'test',
+        'BCRYPT_LOG_ROUNDS': '4',
+    })
+    try:
+        import app
+    finally:
+        flask_pymongo.MongoClient = original_client
+
+    universities = []
+    for university_id, group in df.groupby('university_id'):
+        first = group.iloc[0]
+        universities.append({
+            "university_id": university_id,
+            "name": first['university_name'],
+            "location": first['location'],
+            "degree_programs": sorted(group['degree_programs'].unique().tolist()),
+        })
+    app.mongo.db.universities.insert_many(universities)
+    return app
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
+
+
+@pytest.fixture(scope="session")
+def profiles():
+    """Student profiles from the CSV, without ids and labels."""
+    import pandas as pd
+    df = pd.read_csv(CSV_PATH, nrows=200)
+    labels = ['student_id', 'university_id', 'university_name', 'location', 'recommended_university_id']
+    return df.drop(columns=labels).astype(object).to_dict('records')
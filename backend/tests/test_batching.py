@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class GatedPredict:
+    """predict_fn that blocks until released, so tests control when a batch finishes."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def __call__(self, items):
+        self.calls.append(list(items))
+        self.started.set()
+        self.release.wait(5)
+        return [item * 10 for item in items]
+
+
+def test_cancelled_caller_does_not_strand_the_rest_of_the_queue():
+    predict = GatedPredict()
+    batcher = MicroBatcher(predict, window_ms=1, max_batch=1)
+    first = batcher.submit_future(1)
+    assert predict.started.wait(5)
+    # Queued behind the running batch; the caller gives up before it is taken
+    cancelled = batcher.submit_future(2)
+    waiting = batcher.submit_future(3)
+    assert cancelled.cancel()
+    predict.release.set()
+
+    assert first.result(timeout=5) == 10
+    assert waiting.result(timeout=5) == 30
+    assert [2] not in predict.calls
+    assert batcher._worker.is_alive()
+
+
+def test_asyncio_timeout_mid_batch_keeps_the_worker_alive():
+    predict = GatedPredict()
+    batcher = MicroBatcher(predict, window_ms=1, max_batch=8)
+
+    async def timed_out():
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(batcher.submit_future(1)), timeout=0.05)
+        except asyncio.TimeoutError:
+            return "timeout"
+
+    assert asyncio.run(timed_out()) == "timeout"
+    predict.release.set()
+    # The batch the timed-out caller was part of still finishes, and later callers are served
+    assert batcher.submit(2, timeout=5) == 20
+    assert batcher._worker.is_alive()
+
+
+def test_concurrent_items_share_one_model_call():
+    calls = []
+    batcher = MicroBatcher(lambda items: calls.append(list(items)) or [item * 10 for item in items],
+                           window_ms=200, max_batch=8)
+    futures = [batcher.submit_future(i) for i in range(5)]
+    assert [future.result(timeout=5) for future in futures] == [0, 10, 20, 30, 40]
+    assert calls == [[0, 1, 2, 3, 4]]
+    assert batcher.stats()["largest_batch"] == 5
+
+
+def test_full_batch_does_not_wait_for_the_window():
+    calls = []
+    batcher = MicroBatcher(lambda items: calls.append(list(items)) or list(items), window_ms=10_000, max_batch=3)
+    futures = [batcher.submit_future(i) for i in range(3)]
+    assert [future.result(timeout=2) for future in futures] == [0, 1, 2]
+    assert calls == [[0, 1, 2]]
+
+
+def test_lone_item_is_flushed_after_the_window():
+    batcher = MicroBatcher(lambda items: list(items), window_ms=20, max_batch=64)
+    started = time.monotonic()
+    assert batcher.submit("only", timeout=2) == "only"
+    assert time.monotonic() - started < 1
+
+
+def test_failing_item_only_fails_its_own_caller():
+    def predict(items):
+        if "bad" in items:
+            raise ValueError("unscorable profile")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(predict, window_ms=200, max_batch=8)
+    good, bad, other = (batcher.submit_future(item) for item in ("a", "bad", "b"))
+    assert good.result(timeout=5) == "A" and other.result(timeout=5) == "B"
+    with pytest.raises(ValueError, match="unscorable"):
+        bad.result(timeout=5)
+
+
+def test_dead_worker_is_restarted_without_losing_queued_items():
+    batcher = MicroBatcher(lambda items: list(items), window_ms=1)
+    assert batcher.submit(1, timeout=5) == 1
+    # A worker that died leaves its queue behind; the next caller restarts it on the same queue
+    queued = Future()
+    batcher._queue.put((2, queued))
+    batcher._worker = threading.Thread(target=lambda: None)
+    batcher._worker.start()
+    batcher._worker.join()
+    assert batcher.submit(3, timeout=5) == 3
+    assert queued.result(timeout=5) == 2
+
+
+def test_forked_child_starts_its_own_worker_and_queue():
+    batcher = MicroBatcher(lambda items: list(items), window_ms=1)
+    assert batcher.submit(1, timeout=5) == 1
+    parent_queue = batcher._queue
+    batcher._worker_pid = -1  # as seen from a child after os.fork()
+    assert batcher.submit(2, timeout=5) == 2
+    assert batcher._queue is not parent_queue
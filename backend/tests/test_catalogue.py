@@ -0,0 +1,68 @@
+import threading
+
+import mongomock
+
+from catalogue import CatalogueIndex, bump_stored_version, read_stored_version
+
+
+def worker(db, loads=None):
+    def loader():
+        if loads is not None:
+            loads.append(1)
+        return db.universities.find({}, {"_id": 0})
+
+    return CatalogueIndex(
+        loader,
+        version_reader=lambda: read_stored_version(db.catalogue_state),
+        version_bumper=lambda: bump_stored_version(db.catalogue_state),
+        check_seconds=0,
+    )
+
+
+def test_write_in_one_worker_reaches_the_other():
+    db = mongomock.MongoClient().db
+    db.universities.insert_one({"university_id": "P001", "name": "University of Colombo"})
+    a, b = worker(db), worker(db)
+    a.ensure_fresh()
+    b.ensure_fresh()
+    etag = b.snapshot()[0]
+
+    doc = {"university_id": "P002", "name": "University of Moratuwa"}
+    db.universities.insert_one(dict(doc))
+    a.upsert(doc)
+    b.ensure_fresh()
+
+    assert b.get("P002") is not None
+    assert b.snapshot()[0] == a.snapshot()[0] != etag
+
+
+def test_own_write_does_not_trigger_a_reload():
+    db = mongomock.MongoClient().db
+    loads = []
+    a = worker(db, loads)
+    a.ensure_fresh()
+    a.upsert({"university_id": "P001", "name": "University of Colombo"})
+    a.ensure_fresh()
+    assert len(loads) == 1
+
+
+def test_concurrent_first_requests_load_once():
+    db = mongomock.MongoClient().db
+    loads = []
+    a = worker(db, loads)
+    threads = [threading.Thread(target=a.ensure_fresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+
+
+def test_search_without_limit_returns_every_match():
+    db = mongomock.MongoClient().db
+    db.universities.insert_many([{"university_id": f"P{i:03}", "name": f"Colombo Campus {i}"} for i in range(26)])
+    a = worker(db)
+    total, page = a.search("colombo")
+    assert total == len(page) == 26
+    total, page = a.search("colombo", offset=20, limit=20)
+    assert total == 26 and len(page) == 6
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from compact_model import export_compact_model, load_compact_model, verify_parity
+from train import build_preprocessor, split_features
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'sri_lanka_universities_with_degrees.csv')
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    """A pipeline trained like train.py fit (fewer trees to keep the test quick) and its compact export."""
+    X, y = split_features(pd.read_csv(CSV_PATH))
+    preprocessor = build_preprocessor(X)
+    pipeline = Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(n_estimators=20, random_state=42, n_jobs=-1)),
+    ])
+    pipeline.fit(X, y)
+    out_dir = tmp_path_factory.mktemp("model") / "model.compact"
+    export_compact_model(pipeline, str(out_dir))
+    return pipeline, load_compact_model(str(out_dir))
+
+
+def test_parity_on_training_csv(models):
+    pipeline, compact = models
+    report = verify_parity(pipeline, compact, CSV_PATH)
+    assert report["rows"] == 10000
+    assert report["mismatches"] == 0
+    assert report["max_proba_error"] < 1e-9
+
+
+def test_unknown_category_matches_pipeline(models):
+    pipeline, compact = models
+    profile = pd.read_csv(CSV_PATH, nrows=1)[list(compact.feature_names_in_)].to_dict('records')[0]
+    profile['district'] = 'Atlantis'
+    expected = pipeline.predict_proba(pd.DataFrame([profile]))
+    np.testing.assert_allclose(compact.predict_proba([profile]), expected, atol=1e-12)
+
+
+@pytest.mark.parametrize("change", [
+    lambda p: p.clear(),
+    lambda p: p.pop('district'),
+    lambda p: p.update(budget=None),
+    lambda p: p.update(stream=None),
+    lambda p: p.update(budget=float('nan')),
+])
+def test_missing_or_null_features_are_rejected(models, change):
+    _, compact = models
+    profile = pd.read_csv(CSV_PATH, nrows=1)[list(compact.feature_names_in_)].to_dict('records')[0]
+    change(profile)
+    with pytest.raises(ValueError):
+        compact.predict_proba([profile])
+
+
+def test_fingerprint_is_the_content_hash_from_export(models, tmp_path):
+    pipeline, compact = models
+    assert compact.fingerprint == compact.meta["content_hash"]
+    # The same forest exported again is the same model; the hash ignores where and when it was written
+    export_compact_model(pipeline, str(tmp_path / "again.compact"))
+    assert load_compact_model(str(tmp_path / "again.compact")).fingerprint == compact.fingerprint
@@ -0,0 +1,23 @@
+import mongomock
+from pymongo import ASCENDING, IndexModel
+
+from db_indexes import BOOKING_EXPORT_SORT, audit_queries, ensure_indexes
+
+
+def test_declared_indexes_leave_no_flagged_shapes():
+    db = mongomock.MongoClient().db
+    ensure_indexes(db)
+    flagged = [row["route"] for row in audit_queries(db) if row["collscan"] or row["blocking_sort"]]
+    assert flagged == []
+
+
+def test_sort_not_served_by_index_is_flagged():
+    db = mongomock.MongoClient().db
+    ensure_indexes(db, {"booking": [
+        IndexModel([("university_id", ASCENDING), ("booking_date", ASCENDING), ("_id", ASCENDING)])
+    ]})
+    shape = {"route": "export", "collection": "booking", "filter": {"university_id": "P001"},
+             "sort": [("_id", 1)]}
+    assert audit_queries(db, [shape])[0]["blocking_sort"]
+    shape["sort"] = BOOKING_EXPORT_SORT
+    assert not audit_queries(db, [shape])[0]["blocking_sort"]
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from exports import build_export_query, export_sort
+
+
+@pytest.fixture
+def bookings():
+    collection = mongomock.MongoClient().db.booking
+    start = datetime(2024, 1, 1)
+    # Inserted out of date order, with ties, so _id order and export order differ
+    for i in range(30):
+        collection.insert_one({"university_id": f"P00{i % 3}", "booking_date": start + timedelta(days=(i * 7) % 10)})
+    return collection
+
+
+def export_pages(collection, args, page_size):
+    pages, after = [], None
+    while True:
+        page_args = dict(args, limit=str(page_size), **({"after": str(after)} if after else {}))
+        query, limit, _ = build_export_query(page_args, "booking_date", 1000, collection)
+        page = list(collection.find(query).sort(export_sort("booking_date")).limit(limit))
+        if not page:
+            return pages
+        pages.extend(page)
+        after = page[-1]["_id"]
+
+
+@pytest.mark.parametrize("args", [{}, {"university_id": "P001"}, {"from": "2024-01-03", "to": "2024-01-08"}])
+def test_keyset_pages_cover_every_document_once_in_order(bookings, args):
+    query, _, _ = build_export_query(args, "booking_date", 1000, bookings)
+    expected = list(bookings.find(query).sort(export_sort("booking_date")))
+    paged = export_pages(bookings, args, page_size=4)
+    assert [doc["_id"] for doc in paged] == [doc["_id"] for doc in expected]
+
+
+def test_unknown_after_is_rejected(bookings):
+    with pytest.raises(ValueError):
+        build_export_query({"after": "0" * 24}, "booking_date", 1000, bookings)
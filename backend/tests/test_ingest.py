@@ -0,0 +1,93 @@
+import io
+
+import mongomock
+
+from catalogue import CatalogueIndex, read_stored_version
+from ingest import DEFAULT_CSV_PATH, PROGRAM_COLUMNS, UNIVERSITY_COLUMNS, ingest_catalogue
+
+HEADER = ",".join(['student_id'] + UNIVERSITY_COLUMNS + PROGRAM_COLUMNS)
+
+
+def csv(*rows):
+    """A degrees CSV from (university_id, name, program, fee) rows, with a student column ingest must ignore."""
+    lines = [HEADER] + [
+        f'{i},{uid},{name}, Private ,Kandy,TRUE,{i}0,FALSE,{program},About {program},"English, Sinhala",{fee},A/L pass'
+        for i, (uid, name, program, fee) in enumerate(rows)
+    ]
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+ROWS = [
+    ("P001", "University of Kandy", "BSc Physics", 100000),
+    ("P001", "University of Kandy", "BSc Physics", 100000),
+    ("P001", "University of Kandy", "BA Law", 150000),
+    ("P002", "Colombo Institute", "BSc Computing", 200000),
+    ("", "Nameless", "BSc Nothing", 1),
+]
+
+
+def test_rows_collapse_to_one_document_per_university():
+    db = mongomock.MongoClient().db
+    report = ingest_catalogue(db, csv(*ROWS), chunk_size=2)
+
+    assert report["rows"] == 5 and report["skipped_rows"] == 1
+    assert report["universities"] == 2 and report["programs"] == 3 and report["upserted"] == 2
+    doc = db.universities.find_one({"university_id": "P001"}, {"_id": 0})
+    assert doc["university_type"] == "Private" and doc["hostel_available"] is True and doc["ranking"] == 0.0
+    assert [p["name"] for p in doc["degree_programs"]] == ["BA Law", "BSc Physics"]
+    assert doc["degree_programs"][0]["language_mediums"] == ["English", "Sinhala"]
+    assert doc["semester_fee_lkr_range"] == [100000, 150000]
+
+
+def test_reimport_is_idempotent_and_keeps_admin_fields():
+    db = mongomock.MongoClient().db
+    ingest_catalogue(db, csv(*ROWS))
+    db.universities.update_one({"university_id": "P001"}, {"$set": {"website": "https://kandy.example"}})
+    before = list(db.universities.find({}, {"_id": 0}).sort("university_id"))
+
+    report = ingest_catalogue(db, csv(*ROWS))
+
+    assert report["upserted"] == 0 and report["errors"] == 0
+    assert list(db.universities.find({}, {"_id": 0}).sort("university_id")) == before
+    assert before[0]["website"] == "https://kandy.example"
+
+
+def test_each_import_bumps_the_catalogue_version():
+    db = mongomock.MongoClient().db
+    assert read_stored_version(db.catalogue_state) == 0
+    ingest_catalogue(db, csv(*ROWS))
+    ingest_catalogue(db, csv(*ROWS))
+    assert read_stored_version(db.catalogue_state) == 2
+
+
+def test_running_catalogue_index_sees_the_import():
+    db = mongomock.MongoClient().db
+    ingest_catalogue(db, csv(*ROWS))
+    index = CatalogueIndex(
+        lambda: db.universities.find({}, {"_id": 0}),
+        version_reader=lambda: read_stored_version(db.catalogue_state),
+        check_seconds=0,
+    )
+    index.ensure_fresh()
+    etag = index.snapshot()[0]
+    assert index.get("P003") is None
+
+    ingest_catalogue(db, csv(*ROWS, ("P003", "Galle Maritime Academy", "BSc Nautical Science", 90000)))
+    index.ensure_fresh()
+
+    assert index.get("P003")["name"] == "Galle Maritime Academy"
+    assert index.snapshot()[0] != etag
+    total, found = index.search("nautical")
+    assert total == 1 and found[0]["university_id"] == "P003"
+
+
+def test_bundled_csv_matches_its_distinct_universities():
+    import pandas as pd
+
+    db = mongomock.MongoClient().db
+    report = ingest_catalogue(db, DEFAULT_CSV_PATH, chunk_size=3000)
+    df = pd.read_csv(DEFAULT_CSV_PATH, usecols=['university_id', 'degree_programs'])
+
+    assert report["rows"] == len(df) and report["skipped_rows"] == 0
+    assert report["universities"] == db.universities.count_documents({}) == df['university_id'].nunique()
+    assert report["programs"] == len(df.drop_duplicates())
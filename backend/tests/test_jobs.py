@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from jobs import AsyncJobQueue, JobQueue
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_result_and_failure():
+    queue = JobQueue(max_workers=2)
+    done = wait_for(queue, queue.submit("a", lambda: {"ok": True})["job_id"])
+    assert done["status"] == "done" and done["result"] == {"ok": True} and done["finished_at"]
+
+    def boom():
+        raise RuntimeError("scrape failed")
+
+    failed = wait_for(queue, queue.submit("b", boom)["job_id"])
+    assert failed["status"] == "failed" and failed["error"] == "scrape failed" and failed["result"] is None
+    assert "key" not in failed
+
+
+def test_active_key_returns_the_running_job():
+    queue = JobQueue(max_workers=2)
+    release = threading.Event()
+    first = queue.submit("P001", release.wait)
+    assert queue.submit("P001", release.wait)["job_id"] == first["job_id"]
+
+    release.set()
+    wait_for(queue, first["job_id"])
+    assert queue.submit("P001", lambda: None)["job_id"] != first["job_id"]
+
+
+def test_finished_jobs_are_pruned_after_retention():
+    queue = JobQueue(retention_seconds=0)
+    job_id = queue.submit("a", lambda: 1)["job_id"]
+    wait_for(queue, job_id)
+    time.sleep(0.01)
+    queue.submit("b", lambda: 2)
+    assert queue.get(job_id) is None
+
+
+def test_async_queue_matches_the_threaded_one():
+    async def scenario():
+        queue = AsyncJobQueue(max_concurrency=2)
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return "summary"
+
+        async def boom():
+            raise RuntimeError("llm down")
+
+        first = queue.submit("P001", fetch)
+        assert queue.submit("P001", fetch)["job_id"] == first["job_id"]
+        failed = queue.submit("P002", boom)
+        await asyncio.sleep(0.05)
+        return queue.get(first["job_id"]), queue.get(failed["job_id"])
+
+    done, failed = asyncio.run(scenario())
+    assert done["status"] == "done" and done["result"] == "summary"
+    assert failed["status"] == "failed" and failed["error"] == "llm down"
+
+
+def poll(client, job_id, university_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get(f'/api/university/update-info/{job_id}', query_string={'university_id': university_id})
+        if response.status_code != 202:
+            return response
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def university_id(backend):
+    university_id = backend.mongo.db.universities.find_one({}, {"_id": 0})['university_id']
+    backend.mongo.db.university_info.delete_many({"university_id": university_id})
+    return university_id
+
+
+def test_update_info_queues_a_job_then_serves_the_stored_summary(client, backend, university_id, monkeypatch):
+    monkeypatch.setattr(backend, 'generate_university_summary', lambda university: f"About {university['name']}")
+
+    response = client.post('/api/university/update-info', json={'university_id': university_id})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] == 'queued' and job['university_id'] == university_id
+
+    result = poll(client, job['job_id'], university_id)
+    assert result.status_code == 200
+    payload = result.get_json()
+    assert payload['status'] == 'done' and payload['updated_info'].startswith('About ') and not payload['cached']
+
+    cached = client.post('/api/university/update-info', json={'university_id': university_id})
+    assert cached.status_code == 200 and cached.get_json()['cached']
+    assert cached.get_json()['updated_info'] == payload['updated_info']
+
+    # Another worker process does not know the job id, but finds the stored summary
+    other = client.get('/api/university/update-info/unknown', query_string={'university_id': university_id})
+    assert other.status_code == 200 and other.get_json()['status'] == 'done'
+
+
+def test_failed_job_reports_its_error(client, backend, university_id, monkeypatch):
+    def unavailable(university):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(backend, 'generate_university_summary', unavailable)
+
+    job = client.post('/api/university/update-info', json={'university_id': university_id}).get_json()
+    result = poll(client, job['job_id'], university_id)
+
+    assert result.status_code == 500
+    assert result.get_json() == {'job_id': job['job_id'], 'status': 'failed', 'error': 'LLM unavailable'}
+    assert client.get('/api/university/update-info/unknown').status_code == 404
+
+
+def test_update_info_validates_the_university(client):
+    assert client.post('/api/university/update-info', json={}).status_code == 400
+    assert client.post('/api/university/update-info', json={'university_id': 'NOPE'}).status_code == 404
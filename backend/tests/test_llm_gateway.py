@@ -0,0 +1,201 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_gateway import FakeBackend, LLMGateway
+
+MESSAGES = [{"role": "user", "content": "Which universities offer medicine?"}]
+
+
+class CountingBackend(FakeBackend):
+    def __init__(self, delay):
+        super().__init__(delay)
+        self.calls = 0
+
+    async def acomplete(self, model, messages, temperature, max_tokens):
+        self.calls += 1
+        return await super().acomplete(model, messages, temperature, max_tokens)
+
+
+def test_followers_get_the_answer_when_the_leader_is_cancelled():
+    async def scenario():
+        backend = CountingBackend(delay=0.05)
+        gateway = LLMGateway(backend, max_concurrency=2)
+        leader = asyncio.create_task(gateway.acomplete(MESSAGES))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(gateway.acomplete(MESSAGES)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        answers = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return backend.calls, answers, gateway.stats()
+
+    calls, answers, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert len(set(answers)) == 1 and answers[0].startswith("[gpt-4-turbo]")
+    assert stats["coalesced"] == 3
+
+
+def test_upstream_errors_reach_every_caller():
+    class FailingBackend(FakeBackend):
+        async def acomplete(self, model, messages, temperature, max_tokens):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+    async def scenario():
+        gateway = LLMGateway(FailingBackend())
+        return await asyncio.gather(*(gateway.acomplete(MESSAGES) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+class TrackingBackend(FakeBackend):
+    """Streams a fixed number of words and records whether the upstream stream was closed."""
+
+    def __init__(self, words=50):
+        super().__init__(delay=0)
+        self.words = words
+        self.calls = 0
+        self.closed = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def complete(self, model, messages, temperature, max_tokens):
+        self.calls += 1
+        self.gate.wait(5)
+        return "answer", {"prompt_tokens": 1, "completion_tokens": 1}
+
+    def stream(self, model, messages, temperature, max_tokens, usage):
+        self.calls += 1
+        try:
+            for i in range(self.words):
+                yield f"w{i} "
+        finally:
+            self.closed += 1
+
+    async def astream(self, model, messages, temperature, max_tokens, usage):
+        self.calls += 1
+        try:
+            for i in range(self.words):
+                await asyncio.sleep(0.001)
+                yield f"w{i} "
+        finally:
+            self.closed += 1
+
+
+def assert_slots_released(gateway):
+    for _ in range(gateway.max_concurrency):
+        assert gateway._semaphore.acquire(blocking=False)
+
+
+def test_closing_a_stream_closes_upstream_and_caches_nothing():
+    backend = TrackingBackend()
+    gateway = LLMGateway(backend, max_concurrency=2)
+    chunks = gateway.stream(MESSAGES)
+    assert [next(chunks) for _ in range(3)] == ["w0 ", "w1 ", "w2 "]
+    chunks.close()
+
+    stats = gateway.stats()
+    assert backend.closed == 1
+    assert stats["streams_cancelled"] == 1 and stats["cache_size"] == 0
+    assert_slots_released(gateway)
+
+
+def test_completed_stream_is_served_from_the_cache():
+    backend = TrackingBackend(words=5)
+    gateway = LLMGateway(backend)
+    first = "".join(gateway.stream(MESSAGES))
+
+    assert list(gateway.stream(MESSAGES)) == [first]
+    assert gateway.complete(MESSAGES) == first
+    assert backend.calls == 1 and gateway.stats()["cache_hits"] == 2
+
+
+def test_cancelled_async_stream_closes_upstream():
+    backend = TrackingBackend(words=1000)
+
+    async def scenario():
+        gateway = LLMGateway(backend, max_concurrency=1)
+        received = []
+
+        async def consume():
+            async for chunk in gateway.astream(MESSAGES):
+                received.append(chunk)
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The single slot is free again: a new stream can start
+        gateway.cache_ttl = 0
+        assert await asyncio.wait_for(gateway.astream(MESSAGES).__anext__(), 1) == "w0 "
+        return received, gateway.stats()
+
+    received, stats = asyncio.run(scenario())
+    assert 0 < len(received) < 1000
+    assert backend.closed >= 1 and stats["streams_cancelled"] == 1 and stats["cache_size"] == 0
+
+
+def test_sse_client_disconnect_closes_the_stream(backend, monkeypatch):
+    tracking = TrackingBackend(words=1000)
+    gateway = LLMGateway(tracking, max_concurrency=1)
+    monkeypatch.setattr(backend, 'llm', gateway)
+
+    response = backend.app.test_client().post('/api/openai/chat', json={'prompt': 'hi', 'stream': True}, buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    body = iter(response.response)
+    assert next(body).startswith(b'data: {"delta": "w0 "}')
+    response.close()
+
+    assert tracking.closed == 1
+    assert gateway.stats()["streams_cancelled"] == 1
+    assert_slots_released(gateway)
+
+
+def test_sse_stream_ends_with_a_done_event(backend, monkeypatch):
+    monkeypatch.setattr(backend, 'llm', LLMGateway(TrackingBackend(words=3)))
+    body = backend.app.test_client().post('/api/openai/chat', json={'prompt': 'hi', 'stream': True}).get_data(as_text=True)
+    events = body.strip().split("\n\n")
+    assert [json.loads(e[len("data: "):])["delta"] for e in events[:-1]] == ["w0 ", "w1 ", "w2 "]
+    assert events[-1] == "event: done\ndata: {}"
+
+
+def test_waiters_share_one_call_and_later_callers_hit_the_cache():
+    backend = TrackingBackend()
+    backend.gate.clear()
+    gateway = LLMGateway(backend)
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(gateway.complete, MESSAGES) for _ in range(4)]
+        deadline = time.monotonic() + 5
+        while gateway.stats()["coalesced"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        backend.gate.set()
+        answers = [f.result(5) for f in futures]
+
+    assert answers == ["answer"] * 4 and backend.calls == 1
+    assert gateway.stats()["in_flight"] == 0
+    assert gateway.complete(MESSAGES) == "answer"
+    assert backend.calls == 1 and gateway.stats()["cache_hits"] == 1
+
+
+def test_async_waiter_finds_the_answer_cached():
+    async def scenario():
+        backend = CountingBackend(delay=0.02)
+        gateway = LLMGateway(backend)
+        leader = asyncio.create_task(gateway.acomplete(MESSAGES))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(gateway.acomplete(MESSAGES))
+        answers = await asyncio.gather(leader, follower)
+        late = await gateway.acomplete(MESSAGES)
+        return backend.calls, answers, late, gateway.stats()
+
+    calls, answers, late, stats = asyncio.run(scenario())
+    assert calls == 1 and answers[0] == answers[1] == late
+    assert stats["coalesced"] == 1 and stats["cache_hits"] == 1
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from flask import Flask, abort
+
+from metrics import Histogram, MetricsRegistry, SlowRequestProfiler, instrument_flask
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('op_seconds', 'Time per op', ('route',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, '/a')
+    histogram.observe(0.1, '/a')
+    histogram.observe(0.5, '/a')
+    histogram.observe(3.0, '/a')
+
+    assert histogram.render().splitlines() == [
+        '# HELP op_seconds Time per op',
+        '# TYPE op_seconds histogram',
+        'op_seconds_bucket{route="/a",le="0.1"} 2',
+        'op_seconds_bucket{route="/a",le="1.0"} 3',
+        'op_seconds_bucket{route="/a",le="+Inf"} 4',
+        'op_seconds_sum{route="/a"} 3.65',
+        'op_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_histogram_escapes_labels_and_sorts_series():
+    histogram = Histogram('op_seconds', 'Time per op', ('name',), buckets=(1.0,))
+    histogram.observe(0.5, 'z')
+    histogram.observe(0.5, 'say "hi"\\\n')
+    lines = histogram.render().splitlines()
+    assert lines[2] == 'op_seconds_bucket{name="say \\"hi\\"\\\\\\n",le="1.0"} 1'
+    assert lines[-1] == 'op_seconds_count{name="z"} 1'
+
+
+def test_unlabelled_histogram_and_registry():
+    registry = MetricsRegistry()
+    registry.histogram('a_seconds', 'A', buckets=(1.0,)).observe(2.0)
+    registry.histogram('b_seconds', 'B', ('kind',))
+    text = registry.render()
+
+    assert text.endswith('\n')
+    assert 'a_seconds_bucket{le="1.0"} 0\na_seconds_bucket{le="+Inf"} 1\na_seconds_sum 2.0\na_seconds_count 1' in text
+    assert '# TYPE b_seconds histogram' in text and 'b_seconds_bucket' not in text
+
+
+@pytest.fixture
+def instrumented(tmp_path):
+    app = Flask(__name__)
+    histogram = Histogram('http_request_duration_seconds', 'Request latency', ('method', 'route', 'status'))
+    profiler = SlowRequestProfiler(str(tmp_path), sample_rate=1.0, threshold=0.05, interval=0.002)
+
+    @app.route('/items/<item_id>')
+    def item(item_id):
+        return {'item_id': item_id}
+
+    @app.route('/slow')
+    def slow():
+        time.sleep(0.1)
+        return 'done'
+
+    @app.route('/boom', methods=['POST'])
+    def boom():
+        abort(409)
+
+    instrument_flask(app, histogram, profiler)
+    return app.test_client(), histogram, tmp_path
+
+
+def test_requests_are_labelled_by_route_rule(instrumented):
+    client, histogram, _ = instrumented
+    client.get('/items/1')
+    client.get('/items/2')
+    client.post('/boom')
+    client.get('/missing')
+
+    series = {labels: counts for labels, (counts, _) in histogram._series.items()}
+    assert sum(series[('GET', '/items/<item_id>', 200)]) == 2
+    assert sum(series[('POST', '/boom', 409)]) == 1
+    assert sum(series[('GET', 'unmatched', 404)]) == 1
+
+
+def test_profiler_writes_only_requests_over_the_threshold(instrumented):
+    client, _, out_dir = instrumented
+    client.get('/items/1')
+    assert list(out_dir.iterdir()) == []
+
+    client.get('/slow')
+    (profile,) = out_dir.iterdir()
+    assert profile.name.startswith('slow-') and profile.suffix == '.folded'
+    lines = profile.read_text().splitlines()
+    assert lines and all(line.startswith('/slow;') for line in lines)
+    assert any('test_metrics.py:slow' in line for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+def test_metrics_endpoint(client):
+    client.get('/api/universities')
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'route="/api/universities",status="200"' in text
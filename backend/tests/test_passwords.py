@@ -0,0 +1,13 @@
+
+from passwords import PasswordHasher
+
+
+def test_pool_does_not_fork_the_server():
+    hasher = PasswordHasher(rounds=4, max_workers=1)
+    try:
+        assert hasher.executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        pw_hash = hasher.hash("secret")
+        assert hasher.verify(pw_hash, "secret") and not hasher.verify(pw_hash, "wrong")
+        assert not hasher.needs_rehash(pw_hash)
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,61 @@
+import json
+
+
+def test_mixed_rows_fail_only_themselves(client, profiles):
+    missing = dict(profiles[1])
+    missing.pop('district')
+    body = [profiles[0], "not a profile", missing, dict(profiles[2], budget="a lot"), profiles[3]]
+
+    response = client.post('/api/predict/batch', json=body)
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['count'] == 5 and payload['errors'] == 3
+    rows = payload['recommendations']
+    assert rows[1] == {'row': 1, 'error': 'Expected a student profile object'}
+    assert rows[2] == {'row': 2, 'error': "Missing value for feature 'district'"}
+    assert rows[3]['row'] == 3 and set(rows[3]) == {'row', 'error'}
+    for i in (0, 4):
+        assert set(rows[i]) == {'recommended_university_id', 'score'}
+        single = client.post('/api/predict', json=body[i]).get_json()
+        assert rows[i]['recommended_university_id'] == single['recommended_university_id']
+
+
+def test_ndjson_bad_line_fails_only_its_row(client, profiles):
+    lines = [json.dumps(profiles[0]), '{"district": ', json.dumps(profiles[1])]
+
+    response = client.post('/api/predict/batch?top_k=3', data="\n".join(lines) + "\n",
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 3
+    assert rows[1]['row'] == 1 and rows[1]['error'].startswith('Invalid JSON on line 2')
+    for row in (rows[0], rows[2]):
+        assert len(row['top_k']) == 3
+        assert row['top_k'][0]['university_id'] == row['recommended_university_id']
+
+
+def test_students_object_and_empty_batch(client, profiles):
+    payload = client.post('/api/predict/batch', json={'students': profiles[:2]}).get_json()
+    assert payload['count'] == 2 and payload['errors'] == 0
+
+    response = client.post('/api/predict/batch', json=[])
+    assert response.status_code == 200
+    assert response.get_json() == {'recommendations': [], 'count': 0, 'errors': 0}
+
+
+def test_body_that_is_not_a_list_is_rejected(client, profiles):
+    response = client.post('/api/predict/batch', json=profiles[0])
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Expected a list of student profiles'}
+
+
+def test_batch_over_the_row_limit_is_rejected(client, backend, profiles, monkeypatch):
+    monkeypatch.setattr(backend, 'MAX_PREDICT_BATCH', 3)
+
+    assert client.post('/api/predict/batch', json=profiles[:3]).status_code == 200
+    response = client.post('/api/predict/batch', json=profiles[:4])
+    assert response.status_code == 413
+    assert response.get_json() == {'error': 'Batch size exceeds limit of 3'}
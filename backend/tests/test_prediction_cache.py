@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache, fingerprinted_load
+
+COLUMNS = ['district', 'al_passed', 'budget']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(COLUMNS, maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1 and cache.stats()['size'] == 2
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache(COLUMNS, ttl_seconds=60)
+    cache.put('a', 1)
+    clock.now += 59
+    assert cache.get('a') == 1
+    clock.now += 2
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_zero_size_disables_the_cache():
+    cache = PredictionCache(COLUMNS, maxsize=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None and not cache.stats()['enabled']
+
+
+def test_equivalent_profiles_share_a_key():
+    cache = PredictionCache(COLUMNS)
+    a = cache.normalize({'district': ' Colombo ', 'al_passed': True, 'budget': 50000, 'extra': 'ignored'})
+    b = cache.normalize({'district': 'Colombo', 'al_passed': 1, 'budget': 50000.0})
+
+    assert a == {'district': 'Colombo', 'al_passed': 1, 'budget': 50000.0}
+    assert type(a['al_passed']) is int and type(a['budget']) is float
+    assert cache.key(a) == cache.key(b)
+    assert cache.key(a) != cache.key(a, ('top_k', 3))
+
+
+def test_budget_bucketing():
+    cache = PredictionCache(COLUMNS, budget_bucket=10000)
+    low = cache.normalize({'district': 'Colombo', 'al_passed': 1, 'budget': 50001})
+    high = cache.normalize({'district': 'Colombo', 'al_passed': 1, 'budget': 59999})
+    assert low['budget'] == high['budget'] == 55000.0
+    assert cache.normalize({'budget': 60000})['budget'] == 65000.0
+    assert PredictionCache(COLUMNS).normalize({'budget': 50001})['budget'] == 50001.0
+
+
+def test_keys_carry_the_model_hash():
+    profile = {'district': 'Colombo', 'al_passed': 1, 'budget': 1.0}
+    old, new = PredictionCache(COLUMNS, model_hash='old'), PredictionCache(COLUMNS, model_hash='new')
+    old.put(old.key(profile), 'P001')
+    assert old.get(new.key(profile)) is None
+
+
+def test_fingerprint_changes_when_the_model_is_rewritten(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'first')
+    model, first = fingerprinted_load(str(path), lambda p: open(p, 'rb').read())
+    assert model == b'first'
+    assert fingerprinted_load(str(path), lambda p: None)[1] == first
+
+    path.write_bytes(b'second model')
+    os.utime(path, ns=(0, 123))
+    assert fingerprinted_load(str(path), lambda p: None)[1] != first
+
+
+def test_fingerprint_follows_a_swapped_symlink(tmp_path):
+    (tmp_path / 'v1').mkdir()
+    (tmp_path / 'v1' / 'meta.json').write_text('{}')
+    (tmp_path / 'v2').mkdir()
+    (tmp_path / 'v2' / 'meta.json').write_text('{}')
+    link = tmp_path / 'current'
+    link.symlink_to('v1')
+    first = fingerprinted_load(str(link), lambda p: None)[1]
+
+    link.unlink()
+    link.symlink_to('v2')
+    assert fingerprinted_load(str(link), lambda p: None)[1] != first
+
+
+def test_load_retries_while_the_file_changes(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'x')
+    loads = []
+
+    def rewriting_load(p):
+        loads.append(1)
+        if len(loads) == 1:
+            path.write_bytes(b'rewritten during the load')
+        return len(loads)
+
+    assert fingerprinted_load(str(path), rewriting_load)[0] == 2
+
+    with pytest.raises(RuntimeError):
+        fingerprinted_load(str(path), lambda p: path.write_bytes(path.read_bytes() + b'x'))
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from ratings import apply_rating_change, rebuild_rating_aggregates, read_rating_aggregates, validate_rating
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+@pytest.mark.parametrize("rating", [1, 3, 4.5, 5])
+def test_valid_ratings(rating):
+    assert validate_rating(rating) == rating
+
+
+@pytest.mark.parametrize("rating", ["5", None, True, 0, 6, -1, float("nan"), [5]])
+def test_invalid_ratings(rating):
+    with pytest.raises(ValueError):
+        validate_rating(rating)
+
+
+def test_running_aggregate_matches_rebuild(db):
+    db.feedback.insert_many([
+        {"user_email": "a@x", "university_id": "P001", "rating": 4},
+        {"user_email": "b@x", "university_id": "P001", "rating": 5},
+    ])
+    apply_rating_change(db, "P001", new_rating=4)
+    apply_rating_change(db, "P001", new_rating=5)
+    running = read_rating_aggregates(db, ["P001"])
+    rebuild_rating_aggregates(db)
+    assert read_rating_aggregates(db, ["P001"]) == running == {
+        "P001": {"average_rating": 4.5, "count": 2, "histogram": {"4": 1, "5": 1}}
+    }
+
+
+def test_rebuild_skips_non_numeric_ratings(db):
+    db.feedback.insert_many([
+        {"user_email": "a@x", "university_id": "P001", "rating": 3},
+        {"user_email": "b@x", "university_id": "P001", "rating": "5"},
+    ])
+    assert rebuild_rating_aggregates(db, ["P001"]) == 1
+    assert read_rating_aggregates(db, ["P001"])["P001"]["count"] == 1
+
+
+def test_rebuild_keeps_concurrent_increment(db, monkeypatch):
+    """A rating submitted between the rebuild's read and its write must not be overwritten."""
+    import ratings
+
+    db.rating_aggregates.create_index("university_id", unique=True)
+    db.feedback.insert_one({"user_email": "a@x", "university_id": "P001", "rating": 4})
+    apply_rating_change(db, "P001", new_rating=4)
+    compute = ratings._compute_aggregates
+    raced = []
+
+    def racing_compute(db_, scope):
+        result = compute(db_, scope)
+        if not raced:
+            raced.append(True)
+            db.feedback.insert_one({"user_email": "b@x", "university_id": "P001", "rating": 2})
+            apply_rating_change(db, "P001", new_rating=2)
+        return result
+
+    monkeypatch.setattr(ratings, "_compute_aggregates", racing_compute)
+    rebuild_rating_aggregates(db)
+    assert read_rating_aggregates(db, ["P001"])["P001"] == {
+        "average_rating": 3.0, "count": 2, "histogram": {"2": 1, "4": 1}
+    }
+
+
+def test_change_counted_by_a_rebuild_is_not_folded_again(db):
+    """A rating written before the rebuild's snapshot whose $inc lands after its replace counts once."""
+    db.rating_aggregates.create_index("university_id", unique=True)
+    first, second, later = datetime(2026, 1, 1), datetime(2026, 1, 2), datetime(2026, 1, 3)
+    db.feedback.insert_one({"user_email": "a@x", "university_id": "P001", "rating": 4, "timestamp": first})
+    apply_rating_change(db, "P001", new_rating=4, as_of=first)
+
+    db.feedback.insert_one({"user_email": "b@x", "university_id": "P001", "rating": 2, "timestamp": second})
+    rebuild_rating_aggregates(db)
+    assert apply_rating_change(db, "P001", new_rating=2, as_of=second) is False
+    assert read_rating_aggregates(db, ["P001"])["P001"]["count"] == 2
+
+    # b@x changes their rating after the rebuild: that change is folded in
+    db.feedback.update_one({"user_email": "b@x"}, {"$set": {"rating": 5, "timestamp": later}})
+    assert apply_rating_change(db, "P001", old_rating=2, new_rating=5, as_of=later) is True
+    assert read_rating_aggregates(db, ["P001"])["P001"] == {
+        "average_rating": 4.5, "count": 2, "histogram": {"4": 1, "5": 1}
+    }
+
+
+def test_first_rating_of_a_university_creates_its_aggregate(db):
+    db.rating_aggregates.create_index("university_id", unique=True)
+    assert apply_rating_change(db, "P009", new_rating=3, as_of=datetime(2026, 1, 1)) is True
+    assert read_rating_aggregates(db, ["P009"])["P009"]["count"] == 1
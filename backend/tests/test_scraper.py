@@ -0,0 +1,69 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraper import Scraper
+
+PAGES = {
+    "/first": ("utf-8", b"<html><body><h1>First</h1><p>Colombo campus</p></body></html>"),
+    "/bogus": ("x-no-such-charset", "<p>Kandy école</p>".encode("utf-8")),
+}
+PAD = b"<!--" + b"x" * (16 * 1024) + b"-->"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow":
+            # Dribbles a page for ~10 s without ever filling the text budget
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            try:
+                for _ in range(100):
+                    self.wfile.write(PAD)
+                    self.wfile.flush()
+                    time.sleep(0.1)
+            except OSError:
+                pass
+            return
+        charset, body = PAGES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", f"text/html; charset={charset}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_bogus_charset_falls_back_to_utf8(stub_url):
+    assert Scraper().fetch_text(f"{stub_url}/bogus") == "Kandy école"
+
+
+def test_gather_keeps_page_order(stub_url):
+    text = Scraper().gather_text([f"{stub_url}/first", f"{stub_url}/bogus"])
+    assert text == "First Colombo campus Kandy école"
+
+
+def test_deadline_stops_running_downloads(stub_url):
+    scraper = Scraper(max_workers=2)
+    started = time.monotonic()
+    text = scraper.gather_text([f"{stub_url}/first", f"{stub_url}/slow"], deadline=0.5)
+    assert text == "First Colombo campus"
+    # The slow download gives its worker thread back instead of running for its full ~10 s
+    scraper._executor.shutdown(wait=True)
+    assert time.monotonic() - started < 3
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from conftest import BACKEND_DIR
+
+SETUP = """
+import sys
+
+import flask_pymongo
+import mongomock
+
+
+def mongomock_client(*args, **kwargs):
+    kwargs.pop("driver", None)
+    kwargs.pop("connect", None)
+    return mongomock.MongoClient(*args, **kwargs)
+
+
+def worker_modules():
+    return sorted(name for name in ("app",) if name in sys.modules)
+
+
+flask_pymongo.MongoClient = mongomock_client
+"""
+CHECK = """
+admin = app.mongo.db.users.find_one({"username": "admin"})
+assert app.hasher.verify(admin["password"], "admin123")
+print("worker modules:", app.hasher.executor.submit(worker_modules).result())
+app.hasher.shutdown()
+"""
+# An entry script that imports the app at module level (as `python app.py` used to be)
+# and a launcher that only imports it under the __main__ guard (uvicorn, gunicorn, flask run)
+ENTRY_POINTS = {
+    "unguarded": SETUP + "import app\n\nif __name__ == '__main__':\n" + textwrap.indent(CHECK, "    "),
+    "guarded": SETUP + "\nif __name__ == '__main__':\n    import app\n" + textwrap.indent(CHECK, "    "),
+}
+
+
+def run_entry_point(tmp_path, kind):
+    driver = tmp_path / "driver.py"
+    driver.write_text(ENTRY_POINTS[kind])
+    env = dict(os.environ, MONGO_URI="mongodb://localhost:27017/startup_test", LLM_BACKEND="fake",
+               SECRET_KEY="test", BCRYPT_LOG_ROUNDS="4", PASSWORD_HASH_WORKERS="1",
+               MODEL_PATH=str(tmp_path / "missing.joblib"), COMPACT_MODEL_PATH=str(tmp_path / "missing.compact"),
+               PYTHONPATH=BACKEND_DIR)
+    return subprocess.run([sys.executable, str(driver)], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+@pytest.mark.parametrize("kind", ["unguarded", "guarded"])
+def test_startup_on_an_empty_database_creates_the_admin(tmp_path, kind):
+    result = run_entry_point(tmp_path, kind)
+    assert result.returncode == 0, result.stderr
+    assert "Admin user created" in result.stdout
+
+
+def test_pool_workers_do_not_load_the_app(tmp_path):
+    result = run_entry_point(tmp_path, "guarded")
+    assert result.returncode == 0, result.stderr
+    assert "worker modules: []" in result.stdout
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+
+def full_sort_top_k(probabilities, k):
+    return np.argsort(-probabilities, axis=1, kind='stable')[:, :k]
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 12, 40])
+def test_matches_a_full_stable_argsort(backend, k):
+    rng = np.random.default_rng(7)
+    # Votes of a 10-tree forest: many exact ties, most of them at 0.0
+    probabilities = rng.integers(0, 3, size=(500, 12)) / 10.0
+    probabilities[::7] = 0.0
+
+    np.testing.assert_array_equal(backend.top_k_indices(probabilities, k), full_sort_top_k(probabilities, k))
+
+
+def test_matches_a_full_stable_argsort_on_model_output(backend, profiles):
+    probabilities = backend.predict_proba_profiles(profiles)
+    for k in (1, 5, 20):
+        np.testing.assert_array_equal(backend.top_k_indices(probabilities, k), full_sort_top_k(probabilities, k))
+
+
+def test_ties_rank_the_lower_column_first(backend):
+    probabilities = np.array([[0.1, 0.3, 0.3, 0.0, 0.3]])
+    assert backend.top_k_indices(probabilities, 2).tolist() == [[1, 2]]
+    assert backend.top_k_indices(probabilities, 4).tolist() == [[1, 2, 4, 0]]
+
+
+@pytest.mark.parametrize("top_k", ["0", "-2", "many"])
+def test_invalid_top_k_is_rejected(client, profiles, top_k):
+    response = client.post(f'/api/predict?top_k={top_k}', json=profiles[0])
+    assert response.status_code == 400
+    assert client.post(f'/api/predict/batch?top_k={top_k}', json=profiles[:2]).status_code == 400
+
+
+def test_top_k_is_capped(client, backend, profiles):
+    payload = client.post('/api/predict?top_k=1000', json=profiles[0]).get_json()
+    assert len(payload['recommendations']) == min(backend.MAX_TOP_K, len(backend.predictor.classes_))
+
+    payload = client.post('/api/predict', json=dict(profiles[0], top_k=3)).get_json()
+    assert len(payload['recommendations']) == 3
+
+
+def test_recommendations_carry_their_university(client, backend, profiles):
+    payload = client.post('/api/predict?top_k=5', json=profiles[0]).get_json()
+    ranked = payload['recommendations']
+
+    assert payload['recommended_university_id'] == ranked[0]['university_id']
+    assert [r['score'] for r in ranked] == sorted((r['score'] for r in ranked), reverse=True)
+    for recommendation in ranked:
+        university = recommendation['university']
+        expected = backend.mongo.db.universities.find_one({"university_id": recommendation['university_id']}, {"_id": 0})
+        assert university == expected
@@ -0,0 +1,31 @@
+import pandas as pd
+
+import train
+from train import cache_key, infer_compact_dtypes, split_features
+
+
+def test_gaps_after_the_sample_still_load(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text(
+        "student_id,z_score,al_passed,stream,recommended_university_id\n"
+        "1,2,True,Science,P001\n"
+        "2,3,False,Arts,P002\n"
+        "3,,,Arts,P002\n"
+    )
+    dtypes = infer_compact_dtypes(path, sample_rows=2)
+    df = pd.read_csv(path, dtype=dtypes)
+    assert df["z_score"].isna().sum() == 1 and df["z_score"].dtype == "float32"
+
+    X, y = split_features(df)
+    assert X["al_passed"].tolist() == [1, 0, 0]
+    assert list(y) == ["P001", "P002", "P002"]
+
+
+def test_cache_key_changes_with_the_encode_cache_version(tmp_path, monkeypatch):
+    path = tmp_path / "rows.csv"
+    path.write_text("student_id,recommended_university_id\n1,P001\n")
+    key = cache_key([path], 'fit')
+    assert cache_key([path], 'fit') == key != cache_key([path], 'transform')
+
+    monkeypatch.setattr(train, 'ENCODE_CACHE_VERSION', train.ENCODE_CACHE_VERSION + '.next')
+    assert cache_key([path], 'fit') != key
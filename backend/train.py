@@ -0,0 +1,289 @@
+# train.py
+# Local training CLI for the recommendation model (no Colab / Drive needed).
+#
+#   python train.py fit sri_lanka_universities_with_degrees.csv
+#   python train.py update new_rows.csv --base university_recommendation_model.joblib --add-trees 20
+#
+# Data is read with compact dtypes (categories for text, float32 for
+# numbers, nullable booleans) from CSV or Parquet. The encoded feature matrix is cached
+# on disk under a hash of the data and the encoder, so re-running on
+# unchanged data skips preprocessing. `update` keeps the fitted encoder and
+# adds trees to an existing forest with warm_start instead of refitting it.
+import argparse
+import hashlib
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TARGET = 'recommended_university_id'
+FEATURES_TO_DROP = ['student_id', 'university_id', 'university_name', 'location', TARGET]
+BOOL_COLUMNS = ['al_passed', 'ol_passed', 'hostel_required', 'sports_or_extracurricular',
+                'hostel_available', 'international_affiliation']
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '.train_cache')
+# Bump when load_data, split_features or build_preprocessor change what gets encoded,
+# so entries cached by older code are not reused
+ENCODE_CACHE_VERSION = '1'
+
+
+# --- Loading ---
+def infer_compact_dtypes(csv_path, sample_rows=5000):
+    """
+    Pick a compact dtype per column from a sample so the full read never
+    materializes object columns. Only NA-safe dtypes are used: a gap after
+    the sample would make the read fail with int or bool.
+    """
+    sample = pd.read_csv(csv_path, nrows=sample_rows)
+    dtypes = {}
+    for col, dtype in sample.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[col] = 'boolean'
+        elif pd.api.types.is_numeric_dtype(dtype):
+            # Trees compare features as float32, so this loses nothing the model can see
+            dtypes[col] = 'float32'
+        else:
+            dtypes[col] = 'category'
+    return dtypes
+
+
+def load_frame(path):
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)  # Needs pyarrow or fastparquet
+        for col in df.select_dtypes(include=['object', 'string']).columns:
+            df[col] = df[col].astype('category')
+        return df
+    return pd.read_csv(path, dtype=infer_compact_dtypes(path))
+
+
+def load_data(paths):
+    frames = [load_frame(path) for path in paths]
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    # Concatenating categoricals with different vocabularies falls back to object
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def split_features(df):
+    X = df.drop(columns=[c for c in FEATURES_TO_DROP if c in df.columns])
+    for col in BOOL_COLUMNS:
+        if col in X.columns:
+            X[col] = X[col].fillna(False).astype(bool).astype('int8')
+    y = df[TARGET].astype(str).to_numpy()
+    return X, y
+
+
+def build_preprocessor(X):
+    categorical_features = X.select_dtypes(include=['category', 'object', 'string']).columns
+    return ColumnTransformer(
+        transformers=[('cat', OneHotEncoder(handle_unknown='ignore'), list(categorical_features))],
+        remainder='passthrough'
+    )
+
+
+# --- Encoded-matrix cache ---
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(paths, encoder_tag):
+    parts = [file_digest(path) for path in paths] + [
+        ENCODE_CACHE_VERSION, encoder_tag, sklearn.__version__, pd.__version__]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:24]
+
+
+def load_encoded(cache_dir, key):
+    entry = os.path.join(cache_dir, key)
+    if not os.path.exists(os.path.join(entry, 'done')):
+        return None
+    if os.path.exists(os.path.join(entry, 'X.npz')):
+        X = sparse.load_npz(os.path.join(entry, 'X.npz'))
+    else:
+        X = np.load(os.path.join(entry, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(entry, 'y.npy'))
+    preprocessor = joblib.load(os.path.join(entry, 'preprocessor.joblib'))
+    return X, y, preprocessor
+
+
+def store_encoded(cache_dir, key, X, y, preprocessor):
+    entry = os.path.join(cache_dir, key)
+    os.makedirs(entry, exist_ok=True)
+    if sparse.issparse(X):
+        sparse.save_npz(os.path.join(entry, 'X.npz'), X.tocsr(), compressed=False)
+    else:
+        np.save(os.path.join(entry, 'X.npy'), X)
+    np.save(os.path.join(entry, 'y.npy'), y)
+    joblib.dump(preprocessor, os.path.join(entry, 'preprocessor.joblib'))
+    # Written last, so an interrupted run never leaves a half-written entry that looks valid
+    open(os.path.join(entry, 'done'), 'w').close()
+
+
+def encode(paths, cache_dir, preprocessor=None, encoder_tag='fit'):
+    """
+    Encoded (X, y, fitted preprocessor) for the data files, from the cache
+    when possible. With `preprocessor` given it is only applied, not refitted.
+    """
+    key = cache_key(paths, encoder_tag)
+    cached = load_encoded(cache_dir, key) if cache_dir else None
+    if cached is not None:
+        return (*cached, True)
+
+    X_raw, y = split_features(load_data(paths))
+    if preprocessor is None:
+        preprocessor = build_preprocessor(X_raw)
+        X = preprocessor.fit_transform(X_raw)
+    else:
+        X = preprocessor.transform(X_raw[list(preprocessor.feature_names_in_)])
+    y = y.astype(str)
+    if cache_dir:
+        store_encoded(cache_dir, key, X, y, preprocessor)
+    return X, y, preprocessor, False
+
+
+# --- Training ---
+@contextmanager
+def timed(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = round(time.perf_counter() - start, 3)
+
+
+def fit_pass(args, timings):
+    """Encode the data and grow the forest. Returns (X, y, preprocessor, classifier, cache_hit, test_idx)."""
+    base = None
+    if args.command == 'update':
+        base = joblib.load(args.base)
+
+    with timed(timings, 'encode'):
+        if base is None:
+            X, y, preprocessor, cache_hit = encode(args.data, args.cache_dir)
+        else:
+            preprocessor = base.named_steps['preprocessor']
+            tag = hashlib.sha256(joblib.hashing.hash(preprocessor).encode()).hexdigest()
+            X, y, preprocessor, cache_hit = encode(args.data, args.cache_dir, preprocessor, encoder_tag=tag)
+
+    train_idx, test_idx = np.arange(len(y)), None
+    if args.test_size:
+        train_idx, test_idx = train_test_split(
+            np.arange(len(y)), test_size=args.test_size, random_state=args.seed, stratify=y
+        )
+
+    if base is None:
+        classifier = RandomForestClassifier(n_estimators=args.trees, random_state=args.seed, n_jobs=args.jobs)
+    else:
+        classifier = base.named_steps['classifier']
+        if set(np.unique(y)) != set(classifier.classes_.astype(str)):
+            sys.exit("❌ The set of universities changed; run a full `fit` instead of `update`")
+        # Only the new trees are grown; the existing ones are kept as they are
+        classifier.set_params(warm_start=True, n_estimators=len(classifier.estimators_) + args.add_trees,
+                              n_jobs=args.jobs)
+
+    with timed(timings, 'fit'):
+        classifier.fit(X[train_idx], y[train_idx])
+    classifier.set_params(warm_start=False)
+    return X, y, preprocessor, classifier, cache_hit, test_idx
+
+
+def traced_peak_mb(args):
+    """
+    Peak Python allocations of an uncached encode + fit. It runs as a pass
+    of its own because tracemalloc slows allocation-heavy code several
+    times over and would distort the timings.
+    """
+    tracemalloc.start()
+    try:
+        fit_pass(argparse.Namespace(**{**vars(args), 'cache_dir': None}), {})
+        _, peak_traced = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak_traced / 2 ** 20, 1)
+
+
+def train(args):
+    timings = {}
+    X, y, preprocessor, classifier, cache_hit, test_idx = fit_pass(args, timings)
+
+    pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('classifier', classifier)])
+    report = {
+        "command": args.command,
+        "rows": int(len(y)),
+        "encoded_features": int(X.shape[1]),
+        "trees": len(classifier.estimators_),
+        "encoded_cache_hit": cache_hit,
+    }
+    if test_idx is not None:
+        with timed(timings, 'evaluate'):
+            report["accuracy"] = round(float(accuracy_score(y[test_idx], classifier.predict(X[test_idx]))), 4)
+
+    with timed(timings, 'save'):
+        joblib.dump(pipeline, args.out)
+        if args.compact_out:
+            from compact_model import export_compact_model
+            export_compact_model(pipeline, args.compact_out)
+
+    report["seconds"] = timings
+    # ru_maxrss is in KiB on Linux
+    report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    if args.trace_memory:
+        report["peak_traced_mb"] = traced_peak_mb(args)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the university recommendation model")
+    parser.add_argument("command", choices=["fit", "update"],
+                        help="fit: train from scratch; update: add trees to --base with warm_start")
+    parser.add_argument("data", nargs="+", help="CSV or Parquet files with the training columns")
+    parser.add_argument("--base", default=os.path.join(BASE_DIR, 'university_recommendation_model.joblib'),
+                        help="existing pipeline to extend (update only)")
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, 'university_recommendation_model.joblib'))
+    parser.add_argument("--compact-out", default=None, help="also export the compact model to this directory")
+    parser.add_argument("--trees", type=int, default=100, help="forest size for fit")
+    parser.add_argument("--add-trees", type=int, default=20, help="trees to add for update")
+    parser.add_argument("--test-size", type=float, default=0.2, help="held-out fraction for accuracy, 0 to skip")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel tree builders (-1 = all cores)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="encoded-matrix cache, '' to disable")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="repeat encode + fit under tracemalloc to report peak Python allocations")
+    parser.add_argument("--report", default=None, help="write the run report as JSON to this path")
+    args = parser.parse_args()
+
+    report = train(args)
+    print(f"✅ {report['command']}: {report['trees']} trees on {report['rows']} rows "
+          f"({report['encoded_features']} encoded features, cache {'hit' if report['encoded_cache_hit'] else 'miss'})")
+    print("   time:   " + "  ".join(f"{name} {seconds:.2f}s" for name, seconds in report['seconds'].items()))
+    print(f"   memory: peak RSS {report['peak_rss_mb']} MB"
+          + (f", peak traced {report['peak_traced_mb']} MB" if "peak_traced_mb" in report else ""))
+    if "accuracy" in report:
+        print(f"   accuracy on held-out rows: {report['accuracy']:.4f}")
+    print(f"✅ Model pipeline saved to {args.out}" + (f" and {args.compact_out}" if args.compact_out else ""))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
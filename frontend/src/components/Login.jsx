@@ -16,6 +16,7 @@ const Login = () => {
     try {
       const response = await axios.post('http://localhost:5000/login', { username, password });
       localStorage.setItem('user', JSON.stringify(response.data.user));
+      localStorage.setItem('token', response.data.token);
       setSuccess('Login successful!');
       setTimeout(() => navigate('/'), 2000);
     } catch (err) {
@@ -40,20 +40,40 @@ const UniversityCardsSection = ({ recommendedUniversityId, searchResults }) => {
     fetchUniversities();
   }, []);
 
+  // The backend answers 202 with a job_id while the summary is generated in the background
+  const POLL_INTERVAL_MS = 1500;
+  const POLL_TIMEOUT_MS = 90000;
+
+  const pollUpdateInfoJob = async (jobId, universityId) => {
+    const deadline = Date.now() + POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+      const res = await axios.get(
+        `http://localhost:5000/api/university/update-info/${jobId}`,
+        { params: { university_id: universityId }, validateStatus: (status) => status < 400 }
+      );
+      if (res.data.status === "done") return res.data;
+    }
+    throw new Error("Timed out waiting for the latest info.");
+  };
+
   const handleUpdateInfo = async (universityId) => {
     try {
       const res = await axios.post(
         "http://localhost:5000/api/university/update-info",
         { university_id: universityId }
       );
-      const { university_id, updated_info } = res.data;
+      const result = res.status === 202 ? await pollUpdateInfoJob(res.data.job_id, universityId) : res.data;
+      const { university_id, updated_info } = result;
       setUpdatedInfo((prev) => ({
         ...prev,
         [university_id]: updated_info,
       }));
       displayMessage("Latest info fetched successfully!");
     } catch (err) {
-      displayMessage("Failed to fetch latest info.", "error");
+      // A failed job answers 500 with its error; a lost job 404; a stuck one times out above
+      const reason = err.response?.data?.error || err.message;
+      displayMessage(`Failed to fetch latest info${reason ? `: ${reason}` : "."}`, "error");
     }
   };
 
@@ -2,6 +2,12 @@ import React, { useState, useEffect } from "react";
 import axios from "axios";
 import { useNavigate } from "react-router-dom";
 
+// The session token from login lets the backend answer without looking the user up again
+const authHeaders = () => {
+  const token = localStorage.getItem("token");
+  return token ? { headers: { Authorization: `Bearer ${token}` } } : {};
+};
+
 const Profile = () => {
   const [userData, setUserData] = useState({ username: "", full_name: "", email: "", age: "", city: "" });
   const [message, setMessage] = useState("");
@@ -18,7 +24,7 @@ const Profile = () => {
 
     const fetchProfile = async () => {
       try {
-        const response = await axios.get(`http://localhost:5000/api/user/profile?username=${storedUser.username}`);
+        const response = await axios.get(`http://localhost:5000/api/user/profile?username=${storedUser.username}`, authHeaders());
         setUserData(response.data);
       } catch (err) {
         setError("Failed to load profile.");
@@ -32,7 +38,8 @@ const Profile = () => {
 
   const handleUpdate = async () => {
     try {
-      await axios.put("http://localhost:5000/api/user/update", userData);
+      const response = await axios.put("http://localhost:5000/api/user/update", userData, authHeaders());
+      if (response.data.token) localStorage.setItem("token", response.data.token);
       setMessage("Profile updated successfully");
       localStorage.setItem("user", JSON.stringify(userData));
     } catch {